@@ -0,0 +1,55 @@
+"""
+Measures how long it takes a data source to load its nodes as the number of paths grows.
+
+Usage:
+    python benchmarks/load_nodes.py [max_paths]
+
+If node construction is linear, the time per path should stay roughly constant across sizes.
+"""
+import asyncio
+import os
+import sys
+import time
+from tempfile import mkdtemp
+
+import pandas as pd
+
+os.environ.setdefault("DTALEDESKTOP_ROOT_DIR", mkdtemp())
+
+from dtale_desktop.models import DataSource, SOURCES  # noqa: E402
+
+
+def _build_source(n_paths: int) -> DataSource:
+    def list_paths():
+        yield from (f"/data/file_{i}.csv" for i in range(n_paths))
+
+    def get_data(path):
+        return pd.DataFrame({"path": [path]})
+
+    source = DataSource(
+        name=f"benchmark_{n_paths}",
+        package_name=f"benchmark_{n_paths}",
+        package_path=f"/benchmark/{n_paths}",
+        list_paths=list_paths,
+        get_data=get_data,
+    )
+    source.register()
+    return source
+
+
+def main(max_paths: int = 100_000) -> None:
+    loop = asyncio.new_event_loop()
+    sizes = [max_paths // 8, max_paths // 4, max_paths // 2, max_paths]
+    print(f"{'paths':>10} {'seconds':>10} {'us/path':>10}")
+    for n_paths in sizes:
+        source = _build_source(n_paths)
+        start = time.perf_counter()
+        loop.run_until_complete(source.load_nodes())
+        elapsed = time.perf_counter() - start
+        assert len(source.nodes) == n_paths
+        print(f"{n_paths:>10} {elapsed:>10.3f} {elapsed / n_paths * 1e6:>10.2f}")
+        del SOURCES[source.id]
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -20,6 +20,27 @@ def run(
     root_dir: str = None,
     additional_loaders_dirs: typing.List[str] = None,
     exclude_default_loaders: bool = None,
+    cache_format: str = None,
+    uncompressed_feather_cache: bool = None,
+    cache_max_bytes: int = None,
+    cache_max_files: int = None,
+    cache_eviction_interval: int = None,
+    compact_dtypes: bool = None,
+    loader_threads: int = None,
+    source_concurrency_limit: int = None,
+    loader_processes: int = None,
+    warm_cache_on_startup: typing.List[str] = None,
+    warm_cache_concurrency: int = None,
+    refresh_check_interval: int = None,
+    preview_rows: int = None,
+    profile_report_workers: int = None,
+    profile_report_worker_max_jobs: int = None,
+    dtale_max_memory_bytes: int = None,
+    dtale_idle_timeout: int = None,
+    dtale_startup_timeout: int = None,
+    dtale_shards: int = None,
+    restore_dtale_instances: bool = None,
+    eager_restore_count: int = None,
     disable_add_data_sources: bool = None,
     disable_edit_data_sources: bool = None,
     disable_edit_layout: bool = None,
@@ -43,6 +64,27 @@ def run(
         ("ROOT_DIR", root_dir),
         ("ADDITIONAL_LOADERS_DIRS", additional_loaders_dirs),
         ("EXCLUDE_DEFAULT_LOADERS", exclude_default_loaders),
+        ("CACHE_FORMAT", cache_format),
+        ("UNCOMPRESSED_FEATHER_CACHE", uncompressed_feather_cache),
+        ("CACHE_MAX_BYTES", cache_max_bytes),
+        ("CACHE_MAX_FILES", cache_max_files),
+        ("CACHE_EVICTION_INTERVAL", cache_eviction_interval),
+        ("COMPACT_DTYPES", compact_dtypes),
+        ("LOADER_THREADS", loader_threads),
+        ("SOURCE_CONCURRENCY_LIMIT", source_concurrency_limit),
+        ("LOADER_PROCESSES", loader_processes),
+        ("WARM_CACHE_ON_STARTUP", warm_cache_on_startup),
+        ("WARM_CACHE_CONCURRENCY", warm_cache_concurrency),
+        ("REFRESH_CHECK_INTERVAL", refresh_check_interval),
+        ("PREVIEW_ROWS", preview_rows),
+        ("PROFILE_REPORT_WORKERS", profile_report_workers),
+        ("PROFILE_REPORT_WORKER_MAX_JOBS", profile_report_worker_max_jobs),
+        ("DTALE_MAX_MEMORY_BYTES", dtale_max_memory_bytes),
+        ("DTALE_IDLE_TIMEOUT", dtale_idle_timeout),
+        ("DTALE_STARTUP_TIMEOUT", dtale_startup_timeout),
+        ("DTALE_SHARDS", dtale_shards),
+        ("RESTORE_DTALE_INSTANCES", restore_dtale_instances),
+        ("EAGER_RESTORE_COUNT", eager_restore_count),
         ("DISABLE_ADD_DATA_SOURCES", disable_add_data_sources),
         ("DISABLE_EDIT_DATA_SOURCES", disable_edit_data_sources),
         ("DISABLE_EDIT_LAYOUT", disable_edit_layout),
@@ -8,7 +8,13 @@ from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from dtale_desktop import default_sources, routers, dtale_app
+from dtale_desktop import (
+    default_sources,
+    routers,
+    dtale_app,
+    background_tasks,
+    profile_report_workers,
+)
 from dtale_desktop.actions import UpdateSettings
 from dtale_desktop.file_system import fs
 from dtale_desktop.logger import get_logger
@@ -54,6 +60,42 @@ def register_any_existing_sources() -> None:
                 register_existing_source(path)
 
 
+@app.on_event("startup")
+async def start_background_tasks() -> None:
+    """
+    Start any recurring jobs which have been enabled by the settings.
+    """
+    if settings.CACHE_MAX_BYTES is not None or settings.CACHE_MAX_FILES is not None:
+        background_tasks.start(background_tasks.run_cache_eviction())
+    background_tasks.start(background_tasks.run_refresh_scheduler())
+    if settings.DTALE_IDLE_TIMEOUT is not None:
+        background_tasks.start(background_tasks.run_idle_dtale_reaper())
+    if settings.RESTORE_DTALE_INSTANCES:
+        background_tasks.start(background_tasks.restore_dtale_instances())
+    if settings.WARM_CACHE_ON_STARTUP:
+        sources = background_tasks.find_sources(settings.WARM_CACHE_ON_STARTUP)
+        background_tasks.start(background_tasks.warm_source_caches(sources))
+
+
+@app.on_event("shutdown")
+def snapshot_dtale_instances() -> None:
+    """
+    Remember which dtale instances were running, so they can be restored on startup.
+    """
+    if settings.RESTORE_DTALE_INSTANCES:
+        background_tasks.snapshot_dtale_instances()
+
+
+@app.on_event("shutdown")
+def flush_cache_manifest() -> None:
+    fs.manifest.flush()
+
+
+@app.on_event("shutdown")
+def shut_down_profile_report_workers() -> None:
+    profile_report_workers.shut_down_workers()
+
+
 @app.exception_handler(StarletteHTTPException)
 async def custom_http_exception_handler(request, exc: StarletteHTTPException):
     """
@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from dtale_desktop.settings import settings
+
+__all__ = ["SingleFlight", "run_in_thread"]
+
+T = TypeVar("T")
+
+_THREAD_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _THREAD_POOL
+    if _THREAD_POOL is None:
+        _THREAD_POOL = ThreadPoolExecutor(
+            max_workers=settings.LOADER_THREADS,
+            thread_name_prefix="dtaledesktop-loader",
+        )
+    return _THREAD_POOL
+
+
+async def run_in_thread(func: Callable[..., T], *args) -> T:
+    """
+    Run blocking code (user-provided loaders, cache reads/writes) in the loader thread pool,
+    so it doesn't hold up every other request being served by the event loop.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_get_thread_pool(), partial(func, *args))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller starts the work, and anyone who
+    asks for the same key while it is still running waits for that result instead of starting their own.
+
+    The work is shielded from cancellation, so one caller disconnecting doesn't abort it for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
@@ -0,0 +1,343 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from fnmatch import fnmatch
+from functools import partial
+from typing import Awaitable, Callable, Iterable, List, Optional, Set
+
+from dtale_desktop import dtale_app
+from dtale_desktop.actions import UpdateNode, SetNodeUpdating
+from dtale_desktop.async_utils import SingleFlight, run_in_thread
+from dtale_desktop.file_system import fs
+from dtale_desktop.logger import get_logger
+from dtale_desktop.models import get_node_by_data_id, DataSource, Node, SOURCES
+from dtale_desktop.settings import settings
+
+logger = get_logger()
+
+_RUNNING: Set[asyncio.Future] = set()
+
+# Nodes whose preview is being replaced with the full data, keyed by data_id.
+_PREVIEW_REPLACEMENTS = SingleFlight()
+
+
+def start(coro: Awaitable) -> asyncio.Future:
+    """
+    Schedule a coroutine to run in the background, holding a reference to it until it is finished.
+    """
+    task = asyncio.ensure_future(coro)
+    _RUNNING.add(task)
+    task.add_done_callback(_RUNNING.discard)
+    return task
+
+
+async def evict_cached_files() -> None:
+    """
+    Enforce the cache size limits, then update any nodes whose cached data was removed.
+    """
+    evicted = await run_in_thread(
+        fs.evict_cached_files, settings.CACHE_MAX_BYTES, settings.CACHE_MAX_FILES
+    )
+    # Profile reports built in any mode other than the full one are cached as "{data_id}.{mode}".
+    for data_id in {report_id.split(".", 1)[0] for report_id in evicted}:
+        node = get_node_by_data_id(data_id)
+        if node is None:
+            continue
+        if not fs.data_exists(data_id):
+            node.last_cached_at = None
+        if settings.ENABLE_WEBSOCKET_CONNECTIONS:
+            await UpdateNode(node=node).broadcast()
+
+
+async def run_cache_eviction() -> None:
+    """
+    Runs forever, periodically removing cached files once the cache grows past its limits.
+    """
+    while True:
+        await asyncio.sleep(settings.CACHE_EVICTION_INTERVAL)
+        try:
+            await evict_cached_files()
+        except Exception as e:
+            logger.exception(str(e))
+
+
+async def _shut_down_dtale_instances(data_ids: List[str]) -> None:
+    """
+    Shutting down an instance served by a dtale worker means a request to that worker, so it's done in a thread.
+    One that fails is logged and left running, it doesn't stop the others being shut down.
+    """
+    for data_id in data_ids:
+        node = get_node_by_data_id(data_id)
+        try:
+            if node is None:
+                await run_in_thread(dtale_app.kill_instance, data_id)
+                continue
+            await run_in_thread(node.shut_down)
+        except Exception as e:
+            detail = getattr(e, "detail", e)
+            logger.exception(f"Unable to shut down dtale instance {data_id}: {detail}")
+            continue
+        if settings.ENABLE_WEBSOCKET_CONNECTIONS:
+            await UpdateNode(node=node).broadcast()
+
+
+async def evict_dtale_instances(keep: Iterable[str] = ()) -> None:
+    """
+    If the running dtale instances are using more memory than allowed, shut down the least recently used ones.
+    """
+    if settings.DTALE_MAX_MEMORY_BYTES is None:
+        return
+    data_ids = await run_in_thread(
+        dtale_app.instances_over_budget, settings.DTALE_MAX_MEMORY_BYTES, list(keep)
+    )
+    if data_ids:
+        logger.info(f"Shutting down {len(data_ids)} dtale instances to free up memory")
+        await _shut_down_dtale_instances(data_ids)
+
+
+async def reap_idle_dtale_instances() -> None:
+    """
+    Shut down any dtale instances which haven't been used within the idle timeout.
+    """
+    data_ids = await run_in_thread(
+        dtale_app.idle_instances, settings.DTALE_IDLE_TIMEOUT
+    )
+    if data_ids:
+        logger.info(f"Shutting down {len(data_ids)} idle dtale instances")
+        await _shut_down_dtale_instances(data_ids)
+
+
+async def run_idle_dtale_reaper() -> None:
+    """
+    Runs forever, periodically shutting down idle dtale instances.
+    """
+    while True:
+        # At least a second apart, so a timeout of 0 (or less) doesn't turn this into a busy loop.
+        await asyncio.sleep(max(min(settings.DTALE_IDLE_TIMEOUT, 60), 1))
+        try:
+            await reap_idle_dtale_instances()
+        except Exception as e:
+            logger.exception(str(e))
+
+
+async def replace_preview(node: Node) -> None:
+    """
+    Load the full data for a node which was launched with a preview, and swap it into the dtale instance.
+    The node is likely to be opened again before that's done, which waits for the same replacement
+    (swapping the data in resets the instance, so it should only happen once).
+    """
+    await _PREVIEW_REPLACEMENTS.run(node.data_id, partial(_replace_preview, node))
+
+
+async def _replace_preview(node: Node) -> None:
+    try:
+        await node.load_full_data()
+        node.error = None
+    except Exception as e:
+        logger.exception(str(e))
+        node.error = str(e)
+    if settings.ENABLE_WEBSOCKET_CONNECTIONS:
+        await UpdateNode(node=node).broadcast()
+    await evict_dtale_instances()
+
+
+async def broadcast_profile_report_result(node: Node, result: asyncio.Future) -> None:
+    """
+    Push the node to every client as soon as its profile report has been built (or failed to build, in which
+    case the node's profile_report_error says why).
+    """
+    await asyncio.wait([result])
+    await UpdateNode(node=node).broadcast()
+
+
+def find_sources(references: Iterable[str]) -> List[DataSource]:
+    """
+    Look up sources by id, package name or display name. "all" matches every source.
+    """
+    references = set(references)
+    return [
+        source
+        for source in SOURCES.values()
+        if "all" in references
+        or references.intersection({source.id, source.package_name, source.name})
+    ]
+
+
+def uncached_nodes(source: DataSource, pattern: Optional[str] = None) -> List[Node]:
+    """
+    The loaded nodes for a source which are not cached yet, optionally filtered by a glob pattern on their paths.
+    """
+    return [
+        node
+        for node in source.nodes.values()
+        if not fs.data_exists(node.data_id)
+        and (pattern is None or fnmatch(node.path, pattern))
+    ]
+
+
+async def _update_nodes(
+    nodes: List[Node], update: Callable[[Node], Awaitable], concurrency: int
+) -> None:
+    """
+    Apply an update to each of the nodes, at most `concurrency` at a time.
+    Progress is broadcast to clients if websockets are enabled.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _update(node: Node) -> None:
+        async with semaphore:
+            if settings.ENABLE_WEBSOCKET_CONNECTIONS:
+                await SetNodeUpdating(data_id=node.data_id).broadcast()
+            try:
+                await update(node)
+                node.error = None
+            except Exception as e:
+                logger.exception(str(e))
+                node.error = str(e)
+            if settings.ENABLE_WEBSOCKET_CONNECTIONS:
+                await UpdateNode(node=node).broadcast()
+
+    await asyncio.gather(*(_update(node) for node in nodes))
+
+
+async def warm_cache(nodes: List[Node]) -> None:
+    """
+    Load data for each of the nodes, so it's already cached when someone opens them.
+    """
+    await _update_nodes(
+        nodes, lambda node: node.get_data(), settings.WARM_CACHE_CONCURRENCY
+    )
+
+
+async def warm_source_caches(
+    sources: List[DataSource], pattern: Optional[str] = None
+) -> None:
+    """
+    Load all the nodes for each source and then warm the cache for the ones that aren't cached.
+    """
+    for source in sources:
+        try:
+            await source.load_nodes()
+        except Exception as e:
+            logger.exception(str(e))
+            continue
+        nodes = uncached_nodes(source, pattern)
+        logger.info(f"Warming the cache for {len(nodes)} nodes in '{source.name}'")
+        await warm_cache(nodes)
+
+
+def nodes_due_for_refresh(source: DataSource) -> List[Node]:
+    """
+    The cached nodes for a source whose data is due to be refreshed according to the source's refresh policy.
+    """
+    if source.refresh_policy is None:
+        return []
+    now = datetime.now()
+    due = []
+    for node in source.nodes.values():
+        cached_at = fs.data_cached_at(node.data_id)
+        if cached_at is not None and source.refresh_policy.is_due(cached_at, now):
+            due.append(node)
+    return due
+
+
+async def refresh_due_nodes() -> None:
+    """
+    Reload the data for every node which is due to be refreshed.
+    """
+    nodes = [n for s in list(SOURCES.values()) for n in nodes_due_for_refresh(s)]
+    if nodes:
+        logger.info(f"Refreshing the cached data for {len(nodes)} nodes")
+        await _update_nodes(
+            nodes, lambda node: node.refresh_data(), settings.WARM_CACHE_CONCURRENCY
+        )
+        # The new data may be larger than what it replaced.
+        await evict_dtale_instances()
+
+
+async def run_refresh_scheduler() -> None:
+    """
+    Runs forever, periodically refreshing data for sources which have a refresh policy.
+    """
+    while True:
+        await asyncio.sleep(settings.REFRESH_CHECK_INTERVAL)
+        try:
+            await refresh_due_nodes()
+        except Exception as e:
+            logger.exception(str(e))
+
+
+def snapshot_dtale_instances() -> None:
+    """
+    Save which dtale instances are running (and their settings) so they can be restored after a restart.
+    """
+    snapshot = []
+    for instance in dtale_app.running_instances():
+        node = get_node_by_data_id(instance.data_id)
+        if node is None:
+            continue
+        snapshot.append(
+            {
+                "data_id": node.data_id,
+                "source_id": node.source_id,
+                "path": node.path,
+                "last_accessed_at": instance.last_accessed_at,
+                "settings": dtale_app.get_instance_settings(node.data_id),
+            }
+        )
+    with open(fs.DTALE_SNAPSHOT_PATH, "w") as f:
+        json.dump(snapshot, f)
+
+
+def _restore_lazily(node: Node, instance_settings: Optional[dict]) -> bool:
+    def restore() -> None:
+        data = fs.read_data(node.data_id)
+        dtale_app.launch_instance(data, node.data_id, cached=True)
+        dtale_app.set_instance_settings(node.data_id, instance_settings)
+
+    if dtale_app.restore_on_first_request(node.data_id, restore):
+        node.set_dtale_urls()
+        return True
+    return False
+
+
+async def _restore_eagerly(node: Node, instance_settings: Optional[dict]) -> None:
+    await node.launch_dtale()
+    if not dtale_app.is_running(node.data_id):
+        raise Exception(node.error)
+    dtale_app.set_instance_settings(node.data_id, instance_settings)
+
+
+async def restore_dtale_instances() -> None:
+    """
+    Restore the dtale instances which were running before the last shutdown (as long as their data is still
+    cached). The most recently used ones are launched in the background right away, the rest are launched
+    the first time they're requested so a restart doesn't turn into a flood of loads.
+    """
+    if not os.path.exists(fs.DTALE_SNAPSHOT_PATH):
+        return
+    with open(fs.DTALE_SNAPSHOT_PATH) as f:
+        snapshot = json.load(f)
+    os.remove(fs.DTALE_SNAPSHOT_PATH)
+
+    snapshot = [
+        entry
+        for entry in sorted(snapshot, key=lambda e: e["last_accessed_at"], reverse=True)
+        if entry["source_id"] in SOURCES and fs.data_exists(entry["data_id"])
+    ]
+    eager = []
+    for i, entry in enumerate(snapshot):
+        node = SOURCES[entry["source_id"]].add_node(entry["path"])
+        if i < settings.EAGER_RESTORE_COUNT or not _restore_lazily(
+            node, entry["settings"]
+        ):
+            eager.append((node, entry["settings"]))
+    logger.info(f"Restoring {len(snapshot)} dtale instances ({len(eager)} eagerly)")
+
+    instance_settings = {node.data_id: s for node, s in eager}
+    await _update_nodes(
+        [node for node, _ in eager],
+        lambda node: _restore_eagerly(node, instance_settings[node.data_id]),
+        settings.WARM_CACHE_CONCURRENCY,
+    )
@@ -0,0 +1,226 @@
+"""
+Serialization formats for the on-disk data cache.
+
+Each format knows its file extension and how to write/read a DataFrame. The format used for new cache
+files is chosen with DTALEDESKTOP_CACHE_FORMAT; files written in any other format are still readable,
+and the format of an existing file is always determined from its extension.
+
+Data can also be written as a sequence of chunks (which is what get_data returns for big files), in which
+case the arrow-backed formats append each chunk to the file as it arrives rather than holding them all.
+"""
+import os
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+from typing_extensions import Literal
+
+__all__ = [
+    "CacheFormat",
+    "CacheFormatName",
+    "get_cache_format",
+    "get_cache_format_for_path",
+    "CACHE_FORMATS",
+    "CACHE_FILE_EXTENSIONS",
+    "UnsupportedDataError",
+]
+
+CacheFormatName = Literal["pickle", "feather", "parquet"]
+
+# What pyarrow raises for data it can't store: ArrowInvalid/ArrowTypeError for object columns mixing types or
+# dicts with non-str keys, ValueError for duplicate column names and ArrowNotImplementedError for some dtypes.
+_ARROW_CONVERSION_ERRORS = (ValueError, TypeError, NotImplementedError)
+
+
+class UnsupportedDataError(Exception):
+    """
+    Raised when a format can't store the data. "data" is everything which still has to be written (a DataFrame,
+    or chunks including any which had already been written to the file) so that it can go to another format.
+    """
+
+    def __init__(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]]):
+        super().__init__("The data can't be stored in this format")
+        self.data = data
+
+
+class CacheFormat:
+    """
+    Formats which compress their files should skip that when uncompressed=True, and read with memory_map=True
+    should read through a memory map. Uncompressed files are faster to read (there's nothing to decompress) but
+    take up more disk space. Either way the DataFrame returned is an ordinary (writeable) one, fully loaded
+    into memory. Formats which don't support these ignore them.
+    """
+
+    name: str
+    extension: str
+
+    def can_write(self, data: pd.DataFrame) -> bool:
+        return True
+
+    def write(self, path: str, data: pd.DataFrame, uncompressed: bool = False) -> None:
+        raise NotImplementedError
+
+    def read(self, path: str, memory_map: bool = False) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def write_chunks(
+        self, path: str, chunks: Iterable[pd.DataFrame], uncompressed: bool = False
+    ) -> Tuple[int, int]:
+        """
+        Write the concatenation of the chunks (ignoring their indexes) and return its shape.
+        By default the chunks are just combined in memory first.
+        """
+        data = _concat(chunks)
+        self.write(path, data, uncompressed=uncompressed)
+        return data.shape
+
+
+def _concat(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True, copy=False)
+
+
+class PickleFormat(CacheFormat):
+    name = "pickle"
+    extension = ".pkl"
+
+    def write(self, path: str, data: pd.DataFrame, uncompressed: bool = False) -> None:
+        data.to_pickle(path)
+
+    def read(self, path: str, memory_map: bool = False) -> pd.DataFrame:
+        return pd.read_pickle(path)
+
+
+class _ArrowFormat(CacheFormat):
+    """
+    Arrow-backed formats only support string column names, so anything else (integer labels,
+    MultiIndex columns, etc.) is written using the pickle format instead. Data which turns out to
+    have values arrow can't store raises an UnsupportedDataError, so that can be done for it as well.
+    """
+
+    def can_write(self, data: pd.DataFrame) -> bool:
+        return not isinstance(data.columns, pd.MultiIndex) and all(
+            isinstance(c, str) for c in data.columns
+        )
+
+    @staticmethod
+    def _to_table(data: pd.DataFrame):
+        import pyarrow as pa
+
+        try:
+            return pa.Table.from_pandas(data, preserve_index=None)
+        except _ARROW_CONVERSION_ERRORS as e:
+            raise UnsupportedDataError(data) from e
+
+    def _open_writer(self, path: str, schema, uncompressed: bool):
+        """
+        A writer with write_table and close methods, for appending chunks to a file.
+        """
+        raise NotImplementedError
+
+    def write_chunks(
+        self, path: str, chunks: Iterable[pd.DataFrame], uncompressed: bool = False
+    ) -> Tuple[int, int]:
+        import pyarrow as pa
+
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if first is None:
+            return super().write_chunks(path, [], uncompressed)
+        try:
+            schema = pa.Table.from_pandas(first, preserve_index=False).schema
+        except _ARROW_CONVERSION_ERRORS as e:
+            raise UnsupportedDataError(chain([first], chunks)) from e
+        writer = self._open_writer(path, schema, uncompressed)
+        rows = 0
+        try:
+            for chunk in chain([first], chunks):
+                try:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    table = table.cast(schema)
+                except _ARROW_CONVERSION_ERRORS:
+                    # The types inferred for a later chunk can't be stored using those of the first one (ie an
+                    # integer column containing floats further down). Fall back to combining them in memory,
+                    # which lets pandas work out the common types (and raises UnsupportedDataError if arrow
+                    # can't store those either).
+                    writer.close()
+                    writer = None
+                    return super().write_chunks(
+                        path,
+                        chain([self.read(path), chunk], chunks),
+                        uncompressed,
+                    )
+                writer.write_table(table)
+                rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows, len(schema.names)
+
+
+class FeatherFormat(_ArrowFormat):
+    name = "feather"
+    extension = ".feather"
+
+    def write(self, path: str, data: pd.DataFrame, uncompressed: bool = False) -> None:
+        from pyarrow import feather
+
+        compression = "uncompressed" if uncompressed else "lz4"
+        feather.write_feather(self._to_table(data), path, compression=compression)
+
+    def _open_writer(self, path: str, schema, uncompressed: bool):
+        import pyarrow as pa
+
+        # Feather (V2) files are arrow IPC files, with one record batch per chunk.
+        options = pa.ipc.IpcWriteOptions(compression=None if uncompressed else "lz4")
+        return pa.ipc.new_file(path, schema, options=options)
+
+    def read(self, path: str, memory_map: bool = False) -> pd.DataFrame:
+        from pyarrow import feather
+
+        return feather.read_table(path, memory_map=memory_map).to_pandas()
+
+
+class ParquetFormat(_ArrowFormat):
+    name = "parquet"
+    extension = ".parquet"
+
+    def write(self, path: str, data: pd.DataFrame, uncompressed: bool = False) -> None:
+        from pyarrow import parquet
+
+        parquet.write_table(self._to_table(data), path, compression="snappy")
+
+    def _open_writer(self, path: str, schema, uncompressed: bool):
+        from pyarrow import parquet
+
+        return parquet.ParquetWriter(path, schema, compression="snappy")
+
+    def read(self, path: str, memory_map: bool = False) -> pd.DataFrame:
+        from pyarrow import parquet
+
+        return parquet.read_table(path).to_pandas()
+
+
+CACHE_FORMATS: Dict[str, CacheFormat] = {
+    fmt.name: fmt for fmt in (PickleFormat(), FeatherFormat(), ParquetFormat())
+}
+
+CACHE_FILE_EXTENSIONS: List[str] = [fmt.extension for fmt in CACHE_FORMATS.values()]
+
+
+def get_cache_format(name: str) -> CacheFormat:
+    try:
+        return CACHE_FORMATS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown cache format '{name}', expected one of {list(CACHE_FORMATS)}"
+        )
+
+
+def get_cache_format_for_path(path: str) -> Optional[CacheFormat]:
+    extension = os.path.splitext(path)[1]
+    return next(
+        (fmt for fmt in CACHE_FORMATS.values() if fmt.extension == extension), None
+    )
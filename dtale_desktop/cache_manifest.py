@@ -0,0 +1,169 @@
+"""
+An index of everything stored in the cache directory.
+
+Looking up whether a node's data is cached (and when it was cached) used to require stat calls against
+the cache files, which adds up quickly when a source has a lot of nodes and the cache lives on a network
+filesystem. The manifest keeps that information in a small sqlite database, mirrored in memory, and is
+kept up to date by the file system whenever cached files are written or deleted. Other processes (like
+dtaledesktop_warm_cache) write to the database too, so the mirror is reloaded by refresh() if the database has
+changed since it was loaded. That's done once per batch of lookups (ie when a source loads its nodes) rather
+than for every miss, so building nodes doesn't run a query per node.
+
+Access times are only needed for deciding what to evict, so rather than committing every cache hit they're
+kept in memory and written in batches: whenever the entries are listed for eviction, at most every
+ACCESS_TIME_FLUSH_INTERVAL seconds otherwise, and when the app shuts down.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+__all__ = ["CacheEntry", "CacheManifest"]
+
+
+class CacheEntry(NamedTuple):
+    data_id: str
+    kind: str  # "data" or "profile_report"
+    format: str
+    size: int
+    modified_at: float  # unix timestamp in seconds
+    accessed_at: float  # unix timestamp in seconds
+    rows: Optional[int] = None
+    columns: Optional[int] = None
+
+
+_COLUMNS = ", ".join(CacheEntry._fields)
+
+_PLACEHOLDERS = ", ".join("?" for _ in CacheEntry._fields)
+
+ACCESS_TIME_FLUSH_INTERVAL = 60
+
+
+class CacheManifest:
+    path: str
+    created: bool
+    _entries: Dict[Tuple[str, str], CacheEntry]
+    _data_version: int
+    # Access times which haven't been written to the database yet.
+    _touched: Dict[Tuple[str, str], float]
+
+    def __init__(self, path: str):
+        self.path = path
+        self.created = not os.path.exists(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    data_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    modified_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    rows INTEGER,
+                    columns INTEGER,
+                    PRIMARY KEY (data_id, kind)
+                )
+                """
+            )
+        self._entries = {}
+        self._touched = {}
+        self._flushed_at = time.monotonic()
+        self._load_entries()
+
+    def _load_entries(self) -> None:
+        with self._lock:
+            self._data_version = self._data_version_now()
+            rows = self._connection.execute(
+                f"SELECT {_COLUMNS} FROM cache_entries"
+            ).fetchall()
+            self._entries = {}
+            for entry in map(CacheEntry._make, rows):
+                key = (entry.kind, entry.data_id)
+                if key in self._touched:
+                    entry = entry._replace(accessed_at=self._touched[key])
+                self._entries[key] = entry
+
+    def _data_version_now(self) -> int:
+        # Changes whenever another connection commits to the database.
+        return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self) -> None:
+        """
+        Pick up any changes made by other processes since the entries were loaded.
+        """
+        with self._lock:
+            changed = self._data_version_now() != self._data_version
+        if changed:
+            self._load_entries()
+
+    def get(self, kind: str, data_id: str) -> Optional[CacheEntry]:
+        return self._entries.get((kind, data_id))
+
+    def entries(self) -> List[CacheEntry]:
+        """
+        Every entry, including any added by other processes.
+        """
+        self.flush()
+        self._load_entries()
+        return list(self._entries.values())
+
+    def put(self, entry: CacheEntry) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO cache_entries ({_COLUMNS}) VALUES ({_PLACEHOLDERS})",
+                entry,
+            )
+            self._entries[(entry.kind, entry.data_id)] = entry
+            self._touched.pop((entry.kind, entry.data_id), None)
+
+    def touch(self, kind: str, data_id: str, accessed_at: float) -> None:
+        """
+        Record an access. This is only written to the database by the next flush.
+        """
+        if self.get(kind, data_id) is None:
+            return
+        with self._lock:
+            key = (kind, data_id)
+            if key in self._entries:
+                self._entries[key] = self._entries[key]._replace(
+                    accessed_at=accessed_at
+                )
+                self._touched[key] = accessed_at
+            due = time.monotonic() - self._flushed_at >= ACCESS_TIME_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write any access times recorded since the last flush.
+        """
+        with self._lock, self._connection:
+            if self._touched:
+                self._connection.executemany(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE data_id = ? AND kind = ?",
+                    [
+                        (t, data_id, kind)
+                        for (kind, data_id), t in self._touched.items()
+                    ],
+                )
+                self._touched.clear()
+            self._flushed_at = time.monotonic()
+
+    def delete(self, kind: str, data_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM cache_entries WHERE data_id = ? AND kind = ?",
+                (data_id, kind),
+            )
+            self._entries.pop((kind, data_id), None)
+            self._touched.pop((kind, data_id), None)
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM cache_entries")
+            self._entries.clear()
+            self._touched.clear()
@@ -1,5 +1,23 @@
+import os
+from typing import Iterator, List, Optional, Union
+
 import pandas as pd
 
+# Files bigger than this are read (and cached) in chunks of CHUNK_ROWS rows, to limit peak memory usage.
+CHUNKED_READ_MIN_BYTES = 64 * 1024 * 1024
+CHUNK_ROWS = 500_000
+
+
+def main(
+    path: str, columns: Optional[List[str]] = None
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    # Only parse the columns the source needs (any that the file doesn't have are ignored).
+    usecols = None if columns is None else set(columns).__contains__
+    if os.path.getsize(path) < CHUNKED_READ_MIN_BYTES:
+        return pd.read_csv(path, usecols=usecols)
+    return _read_chunks(path, usecols)
+
 
-def main(path: str) -> pd.DataFrame:
-    return pd.read_csv(path)
+def _read_chunks(path: str, usecols) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(path, usecols=usecols, chunksize=CHUNK_ROWS) as reader:
+        yield from reader
@@ -0,0 +1,5 @@
+import pandas as pd
+
+
+def main(path: str, nrows: int) -> pd.DataFrame:
+    return pd.read_csv(path, nrows=nrows)
@@ -1,5 +1,9 @@
+from typing import List, Optional
+
 import pandas as pd
 
 
-def main(path: str) -> pd.DataFrame:
-    return pd.read_excel(path)
+def main(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    # Only parse the columns the source needs (any that the file doesn't have are ignored).
+    usecols = None if columns is None else set(columns).__contains__
+    return pd.read_excel(path, usecols=usecols)
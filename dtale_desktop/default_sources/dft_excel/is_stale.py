@@ -0,0 +1,9 @@
+import os
+
+import pandas as pd
+
+
+def main(path: str, cached_at: pd.Timestamp) -> bool:
+    # Rewriting the file updates its modification time, so that's all this compares. Its size when the data
+    # was cached isn't recorded anywhere, and a file changing without its mtime moving forward is rare.
+    return pd.Timestamp.fromtimestamp(os.path.getmtime(path)) > cached_at
@@ -1,5 +1,34 @@
+import os
+from typing import Iterator, Union
+
 import pandas as pd
 
+# JSON lines files bigger than this are read (and cached) in chunks of CHUNK_ROWS rows, to limit peak memory
+# usage. Any other kind of JSON has to be parsed all at once.
+CHUNKED_READ_MIN_BYTES = 64 * 1024 * 1024
+CHUNK_ROWS = 500_000
+
+# Only this many characters of each of the first lines are read, because a minified JSON file is one long line.
+MAX_LINE_LENGTH = 1024 * 1024
+
+
+def _is_record(line: str) -> bool:
+    if len(line) == MAX_LINE_LENGTH and not line.endswith("\n"):
+        return False
+    line = line.strip()
+    return line.startswith("{") and line.endswith("}")
+
+
+def main(path: str) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    with open(path, encoding="utf-8") as f:
+        first_lines = [f.readline(MAX_LINE_LENGTH), f.readline(MAX_LINE_LENGTH)]
+    if not all(_is_record(line) for line in first_lines):
+        return pd.read_json(path)
+    if os.path.getsize(path) < CHUNKED_READ_MIN_BYTES:
+        return pd.read_json(path, lines=True)
+    return _read_chunks(path)
+
 
-def main(path: str) -> pd.DataFrame:
-    return pd.read_json(path)
+def _read_chunks(path: str) -> Iterator[pd.DataFrame]:
+    with pd.read_json(path, lines=True, chunksize=CHUNK_ROWS) as reader:
+        yield from reader
@@ -0,0 +1,22 @@
+from typing import Optional
+
+import pandas as pd
+
+# Only this many characters of each of the first lines are read, because a minified JSON file is one long line.
+MAX_LINE_LENGTH = 1024 * 1024
+
+
+def _is_record(line: str) -> bool:
+    if len(line) == MAX_LINE_LENGTH and not line.endswith("\n"):
+        return False
+    line = line.strip()
+    return line.startswith("{") and line.endswith("}")
+
+
+def main(path: str, nrows: int) -> Optional[pd.DataFrame]:
+    # Only JSON lines files can be read partially, anything else has to be parsed in full.
+    with open(path, encoding="utf-8") as f:
+        first_lines = [f.readline(MAX_LINE_LENGTH), f.readline(MAX_LINE_LENGTH)]
+    if not all(_is_record(line) for line in first_lines):
+        return None
+    return pd.read_json(path, lines=True, nrows=nrows)
@@ -1,13 +1,30 @@
 import _thread
-from typing import Union
+import asyncio
+import atexit
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from subprocess import Popen
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Union
 from urllib.parse import urljoin
 
 import dtale
 import pandas as pd
+import requests
 from dtale import global_state, utils as _utils
+from flask import request
+from werkzeug.serving import make_server
 
+from dtale_desktop.async_utils import run_in_thread
+from dtale_desktop.dtale_shard import SECRET_HEADER
+from dtale_desktop.file_system import fs
+from dtale_desktop.logger import get_logger
 from dtale_desktop.settings import settings
 
+logger = get_logger()
+
 dtale.app.initialize_process_props(host=settings.HOST, port=settings.DTALE_PORT)
 
 DTALE_HOST = dtale.app.ACTIVE_HOST
@@ -23,10 +40,134 @@ app = dtale.app.build_app(DTALE_INTERNAL_ROOT_URL, host=DTALE_HOST, reaper_on=Fa
 global_state.set_app_settings({"hide_shutdown": True})
 
 
+class _RunningInstance(NamedTuple):
+    data_id: str
+    memory_usage: int  # bytes, as reported by DataFrame.memory_usage(deep=True)
+    last_accessed_at: float  # unix timestamp in seconds
+
+
+# Every instance launched by dtaledesktop, ordered from least to most recently used.
+_INSTANCES: "OrderedDict[int, _RunningInstance]" = OrderedDict()
+
+_INSTANCES_LOCK = threading.Lock()
+
+# Root urls of the dtale servers which are known to be accepting connections. Every instance on a server
+# is served by the same process, so once it's in here a newly launched instance is ready immediately.
+_READY_SERVERS: Set[str] = set()
+
+# Instances from before a restart which will be launched the first time they receive a request.
+_PENDING_RESTORES: Dict[int, Callable[[], None]] = {}
+
+# Worker processes serving dtale instances, if DTALEDESKTOP_DTALE_SHARDS is set.
+_SHARD_PROCESSES: List[Popen] = []
+
+
+def _record_instance_access() -> None:
+    """
+    Every request made to an instance (page loads, but also the xhr requests made while someone is using it)
+    counts as an access, so instances are only considered idle once nobody has them open.
+    """
+    data_id = (request.view_args or {}).get("data_id") or request.args.get("data_id")
+    if data_id is not None and str(data_id).isdigit():
+        restore = _PENDING_RESTORES.pop(int(data_id), None)
+        if restore is not None:
+            try:
+                restore()
+            except Exception as e:
+                logger.exception(f"Unable to restore dtale instance {data_id}: {e}")
+        mark_instance_used(int(data_id))
+
+
+# Registered ahead of dtale's own hooks, which may respond to the request before later hooks are called.
+app.before_request_funcs.setdefault(None, []).insert(0, _record_instance_access)
+
+
+# Requests to the extra routes of the dtale workers have to carry this, so nobody else can use them.
+_SHARD_SECRET = secrets.token_urlsafe(32)
+
+# How many seconds to wait for a dtale worker to respond. Launching an instance means reading all of its data,
+# so that gets a lot longer than anything else.
+_SHARD_LAUNCH_TIMEOUT = 300
+
+_SHARD_TIMEOUT = 10
+
+
+def _stop_shards() -> None:
+    for process in _SHARD_PROCESSES:
+        process.terminate()
+
+
 def run():
-    _thread.start_new_thread(
-        app.run, (), dict(host=DTALE_HOST, port=DTALE_PORT, threaded=True)
+    if settings.DTALE_SHARDS:
+        from dtale_desktop.subprocesses import launch_dtale_shard
+
+        for shard in range(settings.DTALE_SHARDS):
+            _SHARD_PROCESSES.append(
+                launch_dtale_shard(_shard_port(shard), _SHARD_SECRET)
+            )
+        atexit.register(_stop_shards)
+        return
+    server = make_server(DTALE_HOST, DTALE_PORT, app, threaded=True)
+    # The socket is already bound and listening, so connections will be accepted from here on.
+    _READY_SERVERS.add(DTALE_INTERNAL_ROOT_URL)
+    _thread.start_new_thread(server.serve_forever, ())
+
+
+def _shard(data_id: Union[str, int]) -> Optional[int]:
+    """
+    Which of the dtale worker processes serves this data_id (None if they aren't being used).
+    Data IDs are md5 hashes, so taking the modulus spreads them evenly.
+    """
+    if not settings.DTALE_SHARDS:
+        return None
+    return _format_data_id(data_id) % settings.DTALE_SHARDS
+
+
+def _shard_port(shard: int) -> int:
+    return DTALE_PORT + shard
+
+
+def _internal_root_url(data_id: Union[str, int]) -> str:
+    shard = _shard(data_id)
+    if shard is None:
+        return DTALE_INTERNAL_ROOT_URL
+    return _utils.build_url(_shard_port(shard), DTALE_HOST)
+
+
+def _external_root_url(data_id: Union[str, int]) -> str:
+    shard = _shard(data_id)
+    if shard is None:
+        return DTALE_EXTERNAL_ROOT_URL
+    if settings.DTALE_ROOT_URL:
+        return settings.DTALE_ROOT_URL.format(shard=shard)
+    return _internal_root_url(data_id)
+
+
+async def wait_until_ready(timeout: float, data_id: Optional[str] = None) -> bool:
+    """
+    Wait for the dtale server (which will serve data_id, if sharded) to be accepting requests,
+    returning False if it isn't within timeout seconds.
+
+    If the server wasn't started by run() (ie it's running in another process), poll its health check with
+    an exponential backoff rather than a fixed interval, so we don't add latency once it's up.
+    """
+    root_url = (
+        DTALE_INTERNAL_ROOT_URL if data_id is None else _internal_root_url(data_id)
     )
+    if root_url in _READY_SERVERS:
+        return True
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    delay = 0.01
+    while True:
+        if await run_in_thread(dtale.views.is_up, root_url):
+            _READY_SERVERS.add(root_url)
+            return True
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.5)
 
 
 def _format_data_id(data_id: Union[str, int]) -> int:
@@ -43,40 +184,235 @@ def _format_data_id(data_id: Union[str, int]) -> int:
 
 
 def get_instance(data_id: Union[str, int]) -> Union[dtale.app.DtaleData, None]:
+    """
+    The instance for data_id, if it's running in this process (ie the dtale workers aren't being used).
+    """
     data_id = _format_data_id(data_id)
     return dtale.app.get_instance(data_id)
 
 
-def launch_instance(data: pd.DataFrame, data_id: str) -> dtale.app.DtaleData:
-    return dtale.app.startup(
-        DTALE_INTERNAL_ROOT_URL,
-        data=data,
-        data_id=_format_data_id(data_id),
-        ignore_duplicate=True,
-        allow_cell_edits=not settings.DISABLE_DTALE_CELL_EDITS,
-    )
+def is_running(data_id: Union[str, int]) -> bool:
+    with _INSTANCES_LOCK:
+        return _format_data_id(data_id) in _INSTANCES
+
+
+def _launch_shard_instance(
+    data: Optional[pd.DataFrame], data_id: str, cached: bool
+) -> int:
+    """
+    Have a dtale worker serve the data, returning how much memory it uses. If it's already cached the worker
+    just reads the cache file (so the data needn't be passed), otherwise the data is written to a temporary
+    file which the worker deletes after reading it.
+    """
+    body = {"dataId": data_id}
+    handoff_path = None
+    if not cached:
+        handoff_path = fs.write_handoff_file(data)
+        body["handoff"] = os.path.basename(handoff_path)
+    try:
+        response = requests.post(
+            urljoin(
+                _internal_root_url(data_id),
+                f"/dtaledesktop/instances/{_format_data_id(data_id)}",
+            ),
+            json=body,
+            headers={SECRET_HEADER: _SHARD_SECRET},
+            timeout=_SHARD_LAUNCH_TIMEOUT,
+        )
+        response.raise_for_status()
+    except Exception:
+        if handoff_path is not None:
+            fs.delete_file(handoff_path)
+        raise
+    return response.json()["memoryUsage"]
+
+
+def launch_instance(
+    data: Optional[pd.DataFrame], data_id: str, cached: bool = False
+) -> Optional[dtale.app.DtaleData]:
+    """
+    Start serving the data. If it's served by a dtale worker, no instance is returned (it's in that process).
+    Passing cached=True (the data is in the cache, unchanged) lets a worker read it from there, in which case
+    data may be None.
+    """
+    _PENDING_RESTORES.pop(_format_data_id(data_id), None)
+    if settings.DTALE_SHARDS:
+        memory_usage = _launch_shard_instance(data, data_id, cached)
+        instance = None
+    else:
+        instance = dtale.app.startup(
+            DTALE_INTERNAL_ROOT_URL,
+            data=data,
+            data_id=_format_data_id(data_id),
+            ignore_duplicate=True,
+            allow_cell_edits=not settings.DISABLE_DTALE_CELL_EDITS,
+        )
+        memory_usage = int(data.memory_usage(deep=True).sum())
+    with _INSTANCES_LOCK:
+        _INSTANCES[_format_data_id(data_id)] = _RunningInstance(
+            data_id, memory_usage, time.time()
+        )
+        _INSTANCES.move_to_end(_format_data_id(data_id))
+    return instance
+
+
+def update_instance_data(
+    data: pd.DataFrame, data_id: str, cached: bool = False
+) -> None:
+    """
+    Replace the data behind a running instance. It keeps the same data_id, so its urls stay the same.
+    """
+    launch_instance(data=data, data_id=data_id, cached=cached)
 
 
 def get_main_url(data_id: str) -> str:
+    root_url = _external_root_url(data_id)
     data_id = _format_data_id(data_id)
-    return urljoin(DTALE_EXTERNAL_ROOT_URL, f"/dtale/main/{data_id}")
+    return urljoin(root_url, f"/dtale/main/{data_id}")
 
 
 def get_charts_url(data_id: str) -> str:
+    root_url = _external_root_url(data_id)
     data_id = _format_data_id(data_id)
-    return urljoin(DTALE_EXTERNAL_ROOT_URL, f"/dtale/charts/{data_id}")
+    return urljoin(root_url, f"/dtale/charts/{data_id}")
 
 
 def get_describe_url(data_id: str) -> str:
+    root_url = _external_root_url(data_id)
     data_id = _format_data_id(data_id)
-    return urljoin(DTALE_EXTERNAL_ROOT_URL, f"/dtale/popup/describe/{data_id}")
+    return urljoin(root_url, f"/dtale/popup/describe/{data_id}")
 
 
 def get_correlations_url(data_id: str) -> str:
+    root_url = _external_root_url(data_id)
     data_id = _format_data_id(data_id)
-    return urljoin(DTALE_EXTERNAL_ROOT_URL, f"/dtale/popup/correlations/{data_id}")
+    return urljoin(root_url, f"/dtale/popup/correlations/{data_id}")
 
 
 def kill_instance(data_id: str) -> None:
+    _PENDING_RESTORES.pop(_format_data_id(data_id), None)
+    if settings.DTALE_SHARDS:
+        requests.delete(
+            urljoin(
+                _internal_root_url(data_id),
+                f"/dtaledesktop/instances/{_format_data_id(data_id)}",
+            ),
+            headers={SECRET_HEADER: _SHARD_SECRET},
+            timeout=_SHARD_TIMEOUT,
+        ).raise_for_status()
     data_id = _format_data_id(data_id)
     global_state.cleanup(data_id)
+    with _INSTANCES_LOCK:
+        _INSTANCES.pop(data_id, None)
+
+
+def mark_instance_used(data_id: Union[str, int]) -> None:
+    """
+    Record that an instance was just used, making it the last to be evicted.
+    """
+    with _INSTANCES_LOCK:
+        data_id = _format_data_id(data_id)
+        if data_id in _INSTANCES:
+            _INSTANCES[data_id] = _INSTANCES[data_id]._replace(
+                last_accessed_at=time.time()
+            )
+            _INSTANCES.move_to_end(data_id)
+
+
+def _sync_shard_access_times() -> None:
+    """
+    Requests to instances served by dtale workers don't pass through this process, so ask the workers when
+    each of their instances was last used.
+    """
+    accessed = {}
+    for shard in range(settings.DTALE_SHARDS):
+        root_url = _utils.build_url(_shard_port(shard), DTALE_HOST)
+        try:
+            response = requests.get(
+                urljoin(root_url, "/dtaledesktop/instances/"),
+                headers={SECRET_HEADER: _SHARD_SECRET},
+                timeout=_SHARD_TIMEOUT,
+            )
+            accessed.update(response.json())
+        except Exception:
+            continue
+    with _INSTANCES_LOCK:
+        for data_id, accessed_at in sorted(accessed.items(), key=lambda i: i[1]):
+            instance = _INSTANCES.get(int(data_id))
+            if instance is not None and accessed_at > instance.last_accessed_at:
+                _INSTANCES[int(data_id)] = instance._replace(
+                    last_accessed_at=accessed_at
+                )
+                _INSTANCES.move_to_end(int(data_id))
+
+
+def instances_memory_usage() -> int:
+    """
+    The combined size (in bytes) of the data behind every running instance.
+    """
+    with _INSTANCES_LOCK:
+        return sum(i.memory_usage for i in _INSTANCES.values())
+
+
+def instances_over_budget(max_bytes: int, keep: Iterable[str] = ()) -> List[str]:
+    """
+    The data_ids of the least recently used instances which would need to be killed in order to
+    bring the combined memory usage down to max_bytes. Instances in "keep" are never included.
+    """
+    if settings.DTALE_SHARDS:
+        _sync_shard_access_times()
+    keep = {_format_data_id(data_id) for data_id in keep}
+    with _INSTANCES_LOCK:
+        total = sum(i.memory_usage for i in _INSTANCES.values())
+        over_budget = []
+        for key, instance in _INSTANCES.items():
+            if total <= max_bytes:
+                break
+            if key not in keep:
+                over_budget.append(instance.data_id)
+                total -= instance.memory_usage
+        return over_budget
+
+
+def idle_instances(timeout: float) -> List[str]:
+    """
+    The data_ids of instances which haven't been used in the last "timeout" seconds.
+    """
+    if settings.DTALE_SHARDS:
+        _sync_shard_access_times()
+    cutoff = time.time() - timeout
+    with _INSTANCES_LOCK:
+        return [i.data_id for i in _INSTANCES.values() if i.last_accessed_at < cutoff]
+
+
+def running_instances() -> List[_RunningInstance]:
+    """
+    Every running instance, ordered from least to most recently used.
+    """
+    with _INSTANCES_LOCK:
+        return list(_INSTANCES.values())
+
+
+def get_instance_settings(data_id: str) -> Optional[dict]:
+    """
+    The dtale settings (sorts, filters, formats etc) for an instance, if it's running in this process.
+    """
+    if settings.DTALE_SHARDS:
+        return None
+    return global_state.get_settings(_format_data_id(data_id)) or None
+
+
+def set_instance_settings(data_id: str, instance_settings: Optional[dict]) -> None:
+    if instance_settings and not settings.DTALE_SHARDS:
+        global_state.set_settings(_format_data_id(data_id), instance_settings)
+
+
+def restore_on_first_request(data_id: str, restore: Callable[[], None]) -> bool:
+    """
+    Defer launching an instance until it receives its first request, at which point restore() is called.
+    This is only possible when instances are served by this process; returns False otherwise.
+    """
+    if settings.DTALE_SHARDS:
+        return False
+    _PENDING_RESTORES[_format_data_id(data_id)] = restore
+    return True
@@ -0,0 +1,133 @@
+"""
+A dtale server running in its own process.
+
+By default every dtale instance is served by one flask server running in a thread of the main process, so a
+single slow request (building a chart or correlations for a big frame) holds up everybody else's grids.
+When DTALEDESKTOP_DTALE_SHARDS is set, that many of these servers are started instead (on consecutive ports
+starting at DTALEDESKTOP_DTALE_PORT) and each data_id is always served by the same one of them.
+
+The main process tells a shard which data to serve through a couple of extra routes. Data is handed over
+through a file in the cache directory rather than being sent in the request, so it's never pickled between
+processes. The shard works out the path itself, and the routes only answer requests carrying the secret
+the main process started the shard with.
+"""
+
+import hmac
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+import dtale
+from dtale import global_state, utils as _utils
+from flask import Flask, abort, jsonify, request
+
+from dtale_desktop.cache_formats import get_cache_format_for_path
+from dtale_desktop.file_system import fs
+from dtale_desktop.settings import settings
+
+__all__ = ["SECRET_ENV_VAR", "SECRET_HEADER", "build_shard_app", "run_shard"]
+
+SECRET_ENV_VAR = "DTALEDESKTOP_SHARD_SECRET"
+
+SECRET_HEADER = "X-DtaleDesktop-Shard-Secret"
+
+
+def _in_cache_dir(path: str) -> bool:
+    cache_dir = os.path.realpath(fs.CACHE_DIR)
+    return os.path.commonpath([os.path.realpath(path), cache_dir]) == cache_dir
+
+
+def _data_path(body: dict) -> Tuple[str, bool]:
+    """
+    The file to read an instance's data from, and whether it was only written for the handoff.
+    """
+    handoff = body.get("handoff")
+    if handoff:
+        if os.path.basename(handoff) != handoff or ".handoff." not in handoff:
+            abort(400)
+        path = os.path.join(fs.CACHE_DIR, handoff)
+    else:
+        # The data was cached by the main process (or a loader process) after this one loaded the manifest.
+        fs.manifest.refresh()
+        path = fs.data_path(str(body["dataId"]))
+    if not _in_cache_dir(path) or not os.path.isfile(path):
+        abort(400)
+    return path, bool(handoff)
+
+
+def build_shard_app(port: int, secret: str) -> Flask:
+    dtale.app.initialize_process_props(host=settings.HOST, port=port)
+    root_url = _utils.build_url(dtale.app.ACTIVE_PORT, dtale.app.ACTIVE_HOST)
+    app = dtale.app.build_app(root_url, host=dtale.app.ACTIVE_HOST, reaper_on=False)
+    global_state.set_app_settings({"hide_shutdown": True})
+
+    last_accessed: Dict[int, float] = {}
+    lock = threading.Lock()
+
+    def record_access() -> None:
+        data_id = (request.view_args or {}).get("data_id") or request.args.get(
+            "data_id"
+        )
+        if data_id is not None and str(data_id).isdigit():
+            with lock:
+                if int(data_id) in last_accessed:
+                    last_accessed[int(data_id)] = time.time()
+
+    app.before_request_funcs.setdefault(None, []).insert(0, record_access)
+
+    def check_secret() -> None:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            abort(403)
+
+    def launch_instance(data_id: int) -> int:
+        """
+        Start (or replace the data for) an instance. The data is read from the cache file for "dataId",
+        unless "handoff" names a file which was only written for the handoff (it's deleted afterwards).
+        Returns how much memory the data uses, since the main process doesn't necessarily read it.
+        """
+        path, remove = _data_path(request.get_json())
+        memory_map = settings.UNCOMPRESSED_FEATHER_CACHE and not remove
+        data = get_cache_format_for_path(path).read(path, memory_map=memory_map)
+        dtale.app.startup(
+            root_url,
+            data=data,
+            data_id=data_id,
+            ignore_duplicate=True,
+            allow_cell_edits=not settings.DISABLE_DTALE_CELL_EDITS,
+        )
+        if remove:
+            os.remove(path)
+        with lock:
+            last_accessed[data_id] = time.time()
+        return int(data.memory_usage(deep=True).sum())
+
+    def kill_instance(data_id: int) -> None:
+        global_state.cleanup(data_id)
+        with lock:
+            last_accessed.pop(data_id, None)
+
+    # DtaleFlask replaces any existing route with the same rule, so both methods have to share one view.
+    @app.route("/dtaledesktop/instances/<int:data_id>", methods=["POST", "DELETE"])
+    def instance(data_id: int):
+        check_secret()
+        if request.method == "POST":
+            return jsonify({"memoryUsage": launch_instance(data_id)})
+        kill_instance(data_id)
+        return "", 204
+
+    @app.route("/dtaledesktop/instances/", methods=["GET"])
+    def list_instances():
+        """
+        When each instance last received a request, so the main process can track idle instances.
+        """
+        check_secret()
+        with lock:
+            return jsonify({str(k): v for k, v in last_accessed.items()})
+
+    return app
+
+
+def run_shard(port: int) -> None:
+    app = build_shard_app(port, os.environ[SECRET_ENV_VAR])
+    app.run(host=dtale.app.ACTIVE_HOST, port=dtale.app.ACTIVE_PORT, threaded=True)
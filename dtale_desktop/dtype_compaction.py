@@ -0,0 +1,104 @@
+"""
+Shrinking DataFrames by storing their columns in more compact dtypes.
+
+Data parsed from text files tends to be stored a lot less efficiently than it could be: strings with only a
+handful of distinct values are kept as one python object per row, and every number is 64 bits wide. When
+DTALEDESKTOP_COMPACT_DTYPES is set, data returned by get_data is compacted before it is cached (which means
+dtale instances get the compacted version too):
+
+- object columns containing only strings, with few distinct values, become categoricals
+- integer columns are downcast to the smallest integer type which holds all their values
+- float columns are downcast to float32 if that doesn't change any of their values
+
+A source can opt out by adding this to its metadata.py:
+
+    compact_dtypes = False
+"""
+from typing import Dict, NamedTuple
+
+import numpy as np
+import pandas as pd
+from pandas.api import types
+
+from dtale_desktop.logger import get_logger
+
+__all__ = ["CompactionStats", "compact_dtypes"]
+
+logger = get_logger()
+
+# Object columns are converted to categoricals if they have at most this many distinct values per row.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+class CompactionStats(NamedTuple):
+    columns: int  # how many columns were converted
+    bytes_before: int  # memory used by those columns before being converted
+    bytes_after: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def _compact_column(column: pd.Series) -> pd.Series:
+    """
+    The column converted to a more compact dtype, or the column itself if there isn't one.
+    """
+    if types.is_object_dtype(column.dtype):
+        if (
+            len(column) > 0
+            and types.infer_dtype(column, skipna=True) == "string"
+            and column.nunique() <= len(column) * CATEGORY_MAX_UNIQUE_RATIO
+        ):
+            return column.astype("category")
+    elif types.is_integer_dtype(column.dtype):
+        compacted = pd.to_numeric(column, downcast="integer")
+        if compacted.dtype.itemsize < column.dtype.itemsize:
+            return compacted
+    elif types.is_float_dtype(column.dtype) and column.dtype.itemsize > 4:
+        compacted = column.astype(np.float32)
+        # Only if every value survives the round trip (NaN != NaN, so compare those separately).
+        if np.array_equal(
+            compacted.to_numpy(dtype=column.dtype), column.to_numpy(), equal_nan=True
+        ):
+            return compacted
+    return column
+
+
+def compact_dtypes(data: pd.DataFrame, label: str = "") -> pd.DataFrame:
+    """
+    A copy of the data with its columns converted to more compact dtypes (see the module docstring).
+    If none of the columns can be compacted then the original DataFrame is returned.
+    """
+    compacted: Dict[int, pd.Series] = {}
+    for i in range(data.shape[1]):
+        column = data.iloc[:, i]
+        result = _compact_column(column)
+        if result is not column:
+            compacted[i] = result
+    if not compacted:
+        return data
+
+    stats = CompactionStats(
+        columns=len(compacted),
+        bytes_before=sum(
+            int(data.iloc[:, i].memory_usage(index=False, deep=True)) for i in compacted
+        ),
+        bytes_after=sum(
+            int(c.memory_usage(index=False, deep=True)) for c in compacted.values()
+        ),
+    )
+    # Combined by position, because column labels needn't be unique.
+    columns = data.columns
+    data = pd.concat(
+        [compacted.get(i, data.iloc[:, i]) for i in range(data.shape[1])],
+        axis=1,
+        copy=False,
+    )
+    data.columns = columns
+    logger.info(
+        f"Compacted {stats.columns} columns of {label or 'data'}, saving "
+        f"{stats.bytes_saved / 1024 ** 2:.1f}MB ({stats.bytes_before / 1024 ** 2:.1f}MB -> "
+        f"{stats.bytes_after / 1024 ** 2:.1f}MB)"
+    )
+    return data
@@ -1,11 +1,24 @@
+import glob
 import os
 import shutil
+import time
+from itertools import chain
 from tempfile import mkdtemp
-from typing import List, Callable, Tuple, Union
+from uuid import uuid4
+from typing import Iterable, List, Callable, Tuple, Union, Optional
 
 import pandas as pd
 from typing_extensions import Literal
 
+from dtale_desktop.cache_formats import (
+    CacheFormat,
+    CACHE_FORMATS,
+    get_cache_format,
+    get_cache_format_for_path,
+    UnsupportedDataError,
+)
+from dtale_desktop.cache_manifest import CacheEntry, CacheManifest
+from dtale_desktop.dtype_compaction import compact_dtypes
 from dtale_desktop.settings import settings
 
 __all__ = ["fs"]
@@ -14,6 +27,17 @@ _SENTINEL = object()
 
 _TimeStampFormat = Literal["pandas", "unix_seconds", "unix_milliseconds"]
 
+_DATA = "data"
+
+_PROFILE_REPORT = "profile_report"
+
+# Profile reports are written gzipped, so they can be sent to browsers as they are. Reports written by older
+# versions are plain html, and are still used. (Formats are listed in order of preference.)
+_PROFILE_REPORT_FORMATS = ("html.gz", "html")
+
+# What get_data returns: a DataFrame, or a sequence of chunks to be concatenated.
+Data = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
 
 class _FileSystem:
     ROOT_DIR: str
@@ -22,6 +46,8 @@ class _FileSystem:
     CACHE_DIR: str
     DATA_DIR: str
     PROFILE_REPORTS_DIR: str
+    DTALE_SNAPSHOT_PATH: str
+    manifest: CacheManifest
 
     _instance = _SENTINEL
 
@@ -36,6 +62,7 @@ class _FileSystem:
         self.CACHE_DIR = os.path.join(self.ROOT_DIR, "cache")
         self.DATA_DIR = os.path.join(self.CACHE_DIR, "data")
         self.PROFILE_REPORTS_DIR = os.path.join(self.CACHE_DIR, "profile_reports")
+        self.DTALE_SNAPSHOT_PATH = os.path.join(self.CACHE_DIR, "dtale_instances.json")
 
         self.create_directory(self.ROOT_DIR)
         self.create_directory(self.CACHE_DIR)
@@ -43,6 +70,10 @@ class _FileSystem:
         self.create_directory(self.PROFILE_REPORTS_DIR)
         self.create_python_package(self.LOADERS_DIR)
 
+        self.manifest = CacheManifest(os.path.join(self.CACHE_DIR, "manifest.sqlite3"))
+        if self.manifest.created:
+            self.rebuild_manifest()
+
     def create_directory(self, path: str) -> None:
         os.makedirs(path, exist_ok=True)
 
@@ -56,7 +87,9 @@ class _FileSystem:
             os.remove(path)
 
     def get_file_last_modified(
-        self, path: str, format: _TimeStampFormat = "pandas",
+        self,
+        path: str,
+        format: _TimeStampFormat = "pandas",
     ) -> Union[int, pd.Timestamp]:
         ts = os.path.getmtime(path)
         if format == "pandas":
@@ -66,47 +99,342 @@ class _FileSystem:
         else:
             return int(ts) * 1000
 
-    @staticmethod
-    def _format_data_file_name(name: str):
-        return name if name.endswith(".pkl") else f"{name}.pkl"
+    @property
+    def cache_format(self) -> CacheFormat:
+        return get_cache_format(settings.CACHE_FORMAT)
+
+    def _data_path_for_format(self, data_id: str, fmt: CacheFormat) -> str:
+        return os.path.join(self.DATA_DIR, f"{data_id}{fmt.extension}")
 
     def data_path(self, data_id: str) -> str:
-        return os.path.join(self.DATA_DIR, self._format_data_file_name(data_id))
+        """
+        Path to the cached data if it exists, otherwise the path it would be written to.
+        """
+        entry = self.manifest.get(_DATA, data_id)
+        fmt = self.cache_format if entry is None else get_cache_format(entry.format)
+        return self._data_path_for_format(data_id, fmt)
+
+    def _build_entry(
+        self,
+        kind: str,
+        data_id: str,
+        path: str,
+        format: str,
+        data: Optional[pd.DataFrame] = None,
+        modified_at: Optional[float] = None,
+        shape: Optional[Tuple[int, int]] = None,
+    ) -> CacheEntry:
+        stat = os.stat(path)
+        if data is not None:
+            shape = data.shape
+        return CacheEntry(
+            data_id=data_id,
+            kind=kind,
+            format=format,
+            size=stat.st_size,
+            modified_at=stat.st_mtime if modified_at is None else modified_at,
+            accessed_at=time.time(),
+            rows=None if shape is None else shape[0],
+            columns=None if shape is None else shape[1],
+        )
+
+    def _register_file(self, *args, **kwargs) -> CacheEntry:
+        entry = self._build_entry(*args, **kwargs)
+        self.manifest.put(entry)
+        return entry
+
+    def _write_file(self, fmt: CacheFormat, path: str, data: Data) -> Tuple[int, int]:
+        """
+        Write the data (a DataFrame or chunks) to path and return its shape.
+        It's written to a temporary file first so readers never see a partially written file.
+        """
+        temp_path = f"{path}.{uuid4().hex}.tmp"
+        uncompressed = settings.UNCOMPRESSED_FEATHER_CACHE
+        try:
+            if isinstance(data, pd.DataFrame):
+                fmt.write(temp_path, data, uncompressed=uncompressed)
+                shape = data.shape
+            else:
+                shape = fmt.write_chunks(temp_path, data, uncompressed=uncompressed)
+            os.replace(temp_path, path)
+        except BaseException:
+            self.delete_file(temp_path)
+            raise
+        return shape
+
+    def write_data_file(
+        self,
+        data_id: str,
+        data: Data,
+        modified_at: Optional[float] = None,
+        compact: bool = False,
+        fallback: bool = True,
+    ) -> CacheEntry:
+        """
+        Write the cache file for data_id without adding it to the manifest.
+        This is what loader processes use; the returned entry should be passed to register_data.
+        If data is a sequence of chunks, they're written one at a time (when the format allows it).
+        If compact is true, the data is converted to more compact dtypes first (see dtype_compaction).
+        Data which the cache format can't store is pickled instead, unless fallback is false
+        (in which case the UnsupportedDataError is raised).
+        """
+        return self._write_data_file(data_id, data, modified_at, compact, fallback)[0]
+
+    def _write_data_file(
+        self,
+        data_id: str,
+        data: Data,
+        modified_at: Optional[float] = None,
+        compact: bool = False,
+        fallback: bool = True,
+    ) -> Tuple[CacheEntry, Optional[pd.DataFrame]]:
+        """
+        Does the work for write_data_file, also returning the data as a single DataFrame if it's in memory
+        (which it isn't if chunks were written without being compacted).
+        """
+        if isinstance(data, pd.DataFrame) and compact:
+            data = compact_dtypes(data, data_id)
+            compact = False
+        if not isinstance(data, pd.DataFrame):
+            chunks = iter(data)
+            first = next(chunks, None)
+            data = [] if first is None else chain([first], chunks)
+            frame = None
+        else:
+            first = frame = data
+        fmt = self.cache_format
+        if first is not None and not fmt.can_write(first):
+            fmt = get_cache_format("pickle")
+        path = self._data_path_for_format(data_id, fmt)
+        try:
+            shape = self._write_file(fmt, path, data)
+        except UnsupportedDataError as e:
+            # Some values can't be stored by arrow (ie object columns mixing ints and strings), but pickle
+            # can store anything.
+            if not fallback:
+                raise
+            fmt = get_cache_format("pickle")
+            path = self._data_path_for_format(data_id, fmt)
+            shape = self._write_file(fmt, path, e.data)
+        for other in CACHE_FORMATS.values():
+            if other is not fmt:
+                self.delete_file(self._data_path_for_format(data_id, other))
+        if modified_at is not None:
+            os.utime(path, (modified_at, modified_at))
+        if compact:
+            # Chunks are compacted once they've been combined, so every chunk ends up with the same dtypes
+            # (an integer column downcast to fit the first chunk might not fit the next one). That takes one
+            # read of the combined data, which is then handed back so the caller doesn't need to read it again.
+            frame = fmt.read(path)
+            compacted = compact_dtypes(frame, data_id)
+            if compacted is not frame:
+                return self._write_data_file(data_id, compacted, modified_at)
+        entry = self._build_entry(
+            _DATA, data_id, path, fmt.name, modified_at=modified_at, shape=shape
+        )
+        return entry, frame
+
+    def write_handoff_file(self, data: pd.DataFrame) -> str:
+        """
+        Write data which isn't cached to a file for a dtale shard to read (see dtale_shard.py),
+        returning its path. The shard deletes it once it has been read.
+        """
+        fmt = self.cache_format
+        if not fmt.can_write(data):
+            fmt = get_cache_format("pickle")
+        name = f"{uuid4().hex}.handoff"
+        try:
+            path = os.path.join(self.CACHE_DIR, f"{name}{fmt.extension}")
+            self._write_file(fmt, path, data)
+        except UnsupportedDataError:
+            fmt = get_cache_format("pickle")
+            path = os.path.join(self.CACHE_DIR, f"{name}{fmt.extension}")
+            self._write_file(fmt, path, data)
+        return path
 
-    def save_data(self, data_id: str, data: pd.DataFrame) -> None:
-        data.to_pickle(self.data_path(data_id))
+    def register_data(self, entry: CacheEntry) -> None:
+        self.manifest.put(entry)
+
+    def save_data(
+        self,
+        data_id: str,
+        data: Data,
+        modified_at: Optional[float] = None,
+        compact: bool = False,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Cache the data, returning it as a single DataFrame unless it was written in chunks
+        and isn't held in memory (in which case read_data has to be used to get it).
+        """
+        entry, frame = self._write_data_file(data_id, data, modified_at, compact)
+        self.register_data(entry)
+        return frame
 
     def data_exists(self, data_id: str) -> bool:
-        return os.path.exists(self.data_path(data_id))
+        return self.manifest.get(_DATA, data_id) is not None
+
+    def data_last_cached_at(self, data_id: str) -> Optional[int]:
+        """
+        When the data was cached, as a unix timestamp in milliseconds (or None if it isn't cached).
+        """
+        entry = self.manifest.get(_DATA, data_id)
+        return None if entry is None else int(entry.modified_at) * 1000
+
+    def data_cached_at(self, data_id: str) -> Optional[pd.Timestamp]:
+        """
+        When the data was cached, as a (local, timezone-naive) timestamp.
+        """
+        entry = self.manifest.get(_DATA, data_id)
+        return None if entry is None else pd.Timestamp.fromtimestamp(entry.modified_at)
 
     def read_data(self, data_id: str) -> pd.DataFrame:
-        return pd.read_pickle(self.data_path(data_id))
+        path = self.data_path(data_id)
+        fmt = get_cache_format_for_path(path)
+        try:
+            data = fmt.read(path, memory_map=settings.UNCOMPRESSED_FEATHER_CACHE)
+        except FileNotFoundError:
+            # The file was removed by something other than this app, so the manifest is out of date.
+            self.manifest.delete(_DATA, data_id)
+            raise
+        self.manifest.touch(_DATA, data_id, time.time())
+        if fmt is not self.cache_format and self.cache_format.can_write(data):
+            # Rewrite it using the current cache format, keeping the original "cached at" time.
+            # If the format can't store it, it's already in the right place.
+            modified_at = self.manifest.get(_DATA, data_id).modified_at
+            try:
+                entry = self.write_data_file(data_id, data, modified_at, fallback=False)
+            except UnsupportedDataError:
+                return data
+            self.register_data(entry)
+        return data
+
+    def touch_data(self, data_id: str) -> None:
+        """
+        Record that the cached data was used without reading it here (ie a dtale worker reads it instead).
+        """
+        self.manifest.touch(_DATA, data_id, time.time())
 
     def delete_data(self, data_id: str) -> None:
-        self.delete_file(self.data_path(data_id))
+        for fmt in CACHE_FORMATS.values():
+            self.delete_file(self._data_path_for_format(data_id, fmt))
+        self.manifest.delete(_DATA, data_id)
+
+    def _profile_report_path_for_format(self, data_id: str, format: str) -> str:
+        return os.path.join(self.PROFILE_REPORTS_DIR, f"{data_id}.{format}")
 
     @staticmethod
-    def _format_profile_report_name(name: str):
-        return name if name.endswith(".html") else f"{name}.html"
+    def _profile_report_name(file_name: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        The data_id and format of a profile report file, or (None, None) if it isn't one.
+        """
+        for format in _PROFILE_REPORT_FORMATS:
+            if file_name.endswith(f".{format}"):
+                return file_name[: -len(format) - 1], format
+        return None, None
 
-    def profile_report_path(self, data_id: str):
-        return os.path.join(
-            self.PROFILE_REPORTS_DIR, self._format_profile_report_name(data_id)
-        )
+    def profile_report_path(self, data_id: str) -> str:
+        """
+        Where the profile report for data_id should be written (gzipped).
+        """
+        return self._profile_report_path_for_format(data_id, _PROFILE_REPORT_FORMATS[0])
+
+    def register_profile_report(self, data_id: str) -> None:
+        """
+        Add a profile report to the manifest. Reports are written by a separate process,
+        so this needs to be called once that process is finished.
+        """
+        for format in _PROFILE_REPORT_FORMATS:
+            path = self._profile_report_path_for_format(data_id, format)
+            if os.path.exists(path):
+                self._register_file(_PROFILE_REPORT, data_id, path, format)
+                return
 
     def profile_report_exists(self, data_id: str) -> bool:
-        return os.path.exists(self.profile_report_path(data_id))
+        return self.manifest.get(_PROFILE_REPORT, data_id) is not None
 
-    def read_profile_report(self, data_id: str) -> str:
-        with open(self.profile_report_path(data_id), encoding="utf-8") as f:
-            return f.read()
+    def get_profile_report_file(self, data_id: str) -> str:
+        """
+        The path of the profile report for data_id, for serving it. It ends in ".gz" if it's gzipped.
+        """
+        entry = self.manifest.get(_PROFILE_REPORT, data_id)
+        if entry is not None:
+            path = self._profile_report_path_for_format(data_id, entry.format)
+            if os.path.exists(path):
+                self.manifest.touch(_PROFILE_REPORT, data_id, time.time())
+                return path
+            # The file was removed by something other than this app, so the manifest is out of date.
+            self.manifest.delete(_PROFILE_REPORT, data_id)
+        raise FileNotFoundError(f"There is no profile report for {data_id}")
 
     def delete_profile_report(self, data_id: str) -> None:
-        self.delete_file(self.profile_report_path(data_id))
+        for format in _PROFILE_REPORT_FORMATS:
+            self.delete_file(self._profile_report_path_for_format(data_id, format))
+        self.manifest.delete(_PROFILE_REPORT, data_id)
+
+    def profile_report_files(self, data_id: str) -> List[str]:
+        """
+        The names of the report files for data_id built in any mode (see profile_report_modes.py).
+        """
+        pattern = os.path.join(self.PROFILE_REPORTS_DIR, f"{glob.escape(data_id)}.*")
+        names = {
+            self._profile_report_name(os.path.basename(p))[0]
+            for p in glob.glob(pattern)
+        }
+        return sorted(name for name in names if name is not None)
+
+    def any_profile_report_exists(self, data_id: str) -> bool:
+        return any(map(self.profile_report_exists, self.profile_report_files(data_id)))
+
+    def delete_profile_reports(self, data_id: str) -> None:
+        for report_id in self.profile_report_files(data_id):
+            self.delete_profile_report(report_id)
 
     def delete_all_cached_data(self, data_id: str) -> None:
         self.delete_data(data_id)
-        self.delete_profile_report(data_id)
+        self.delete_profile_reports(data_id)
+
+    def rebuild_manifest(self) -> None:
+        """
+        Rebuild the manifest by scanning the cache directories.
+        Only necessary if the cache was populated by an older version or modified by hand.
+        """
+        self.manifest.clear()
+        with os.scandir(self.DATA_DIR) as it:
+            for entry in it:
+                fmt = get_cache_format_for_path(entry.path)
+                if entry.is_file() and fmt is not None:
+                    data_id = os.path.splitext(entry.name)[0]
+                    self._register_file(_DATA, data_id, entry.path, fmt.name)
+        with os.scandir(self.PROFILE_REPORTS_DIR) as it:
+            for entry in it:
+                data_id, _ = self._profile_report_name(entry.name)
+                if entry.is_file() and data_id is not None:
+                    self.register_profile_report(data_id)
+
+    def evict_cached_files(
+        self, max_bytes: Optional[int] = None, max_files: Optional[int] = None
+    ) -> List[str]:
+        """
+        Delete the least recently accessed cache files (data and profile reports) until the cache is
+        within the given limits. Returns the data IDs of any files that were deleted.
+        """
+        entries = sorted(self.manifest.entries(), key=lambda e: e.accessed_at)
+        total_bytes = sum(entry.size for entry in entries)
+        total_files = len(entries)
+        evicted = []
+        for entry in entries:
+            if (max_bytes is None or total_bytes <= max_bytes) and (
+                max_files is None or total_files <= max_files
+            ):
+                break
+            if entry.kind == _DATA:
+                self.delete_data(entry.data_id)
+            else:
+                self.delete_profile_report(entry.data_id)
+            total_bytes -= entry.size
+            total_files -= 1
+            evicted.append(entry.data_id)
+        return evicted
 
     def create_temp_directory(
         self, folder_name: str = "temp"
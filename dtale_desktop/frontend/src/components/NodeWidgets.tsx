@@ -70,11 +70,12 @@ const DtaleCorrelationsButton: React.FC<BaseButtonProps> = (props) => (
   <DtaleButton page="correlations" icon={<DotChartOutlined />} {...props} />
 );
 
-const PandasProfileReportButton: React.FC<BaseButtonProps> = ({
-  dispatch,
-  dataId,
-  updating,
-}) => {
+const PandasProfileReportButton: React.FC<
+  BaseButtonProps & {
+    error: Node["profileReportError"];
+    enableWebsocketConnections: boolean;
+  }
+> = ({ dispatch, dataId, updating, error, enableWebsocketConnections }) => {
   const [loading, setLoading] = useState<boolean>(false);
 
   useEffect(() => {
@@ -86,11 +87,15 @@ const PandasProfileReportButton: React.FC<BaseButtonProps> = ({
   return (
     <Button
       size="small"
+      danger={!!error}
+      title={error ? `The last profile report failed to build:\n${error}` : ""}
       loading={loading}
       disabled={updating && !loading}
       onClick={() => {
-        setLoading(true);
-        openProfileReport(dispatch, dataId);
+        if (!enableWebsocketConnections) {
+          setLoading(true);
+        }
+        openProfileReport(dispatch, dataId, enableWebsocketConnections);
       }}
       icon={<ProfileOutlined />}
     >
@@ -164,7 +169,11 @@ export const DataViewerButtons: React.FC<{
         <DtaleCorrelationsButton {...props} />
         <DtaleDescribeButton {...props} />
         {settings.disableProfileReports ? null : (
-          <PandasProfileReportButton {...props} />
+          <PandasProfileReportButton
+            {...props}
+            error={node.profileReportError}
+            enableWebsocketConnections={settings.enableWebsocketConnections}
+          />
         )}
       </div>
       <div className="node-action-link">
@@ -198,7 +207,11 @@ export const CacheButtons: React.FC<{
   node: Node;
 }> = ({ dispatch, node }) => (
   <StyledCacheDisplay>
-    {!node.lastCachedAt ? (
+    {node.preview ? (
+      <Typography.Text type="secondary">
+        Showing a preview while the full data loads...
+      </Typography.Text>
+    ) : !node.lastCachedAt ? (
       <div className="cache-placeholder">...</div>
     ) : (
       <Fragment>
@@ -183,9 +183,14 @@ export const updateSource = (
 
 export const openProfileReport = (
   dispatch: Dispatcher,
-  dataId: Node["dataId"]
+  dataId: Node["dataId"],
+  enableWebsocketConnections: boolean
 ) => {
   window.open(`/node/profile-report/${dataId}/`);
+  if (enableWebsocketConnections) {
+    // The node is updated over the websocket once the report has been built (or fails to build).
+    return;
+  }
   backendRequest({
     dispatch,
     url: `/node/watch-profile-report-builder/${dataId}/`,
@@ -14,6 +14,8 @@ export type Node = {
   lastCachedAt?: number;
   error?: string;
   sortValue?: number;
+  preview?: boolean;
+  profileReportError?: null | string;
 } & StatefulResourceProps;
 
 export type Source = {
@@ -30,6 +32,8 @@ export type Source = {
   listPaths: string;
   getData: string;
   saveData: string;
+  isStale?: string;
+  getPreview?: string;
 } & StatefulResourceProps;
 
 export type SourceTemplate = Pick<Source, "id" | "name" | "listPaths" | "getData">;
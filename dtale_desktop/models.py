@@ -1,8 +1,13 @@
 import asyncio
 import inspect
 import os
+import re
+import sys
 from collections import OrderedDict as ordereddict
+from functools import partial
+from glob import escape, glob
 from hashlib import md5
+from itertools import islice
 from tempfile import mkdtemp
 from typing import (
     List,
@@ -18,10 +23,17 @@ from fastapi.exceptions import HTTPException
 from pydantic.class_validators import root_validator
 from pydantic.fields import Field
 
-from dtale_desktop import dtale_app
-from dtale_desktop.file_system import fs
+from dtale_desktop import dtale_app, profile_report_workers
+from dtale_desktop.async_utils import SingleFlight, run_in_thread
+from dtale_desktop.dtype_compaction import compact_dtypes
+from dtale_desktop.file_system import Data, fs
 from dtale_desktop.logger import get_logger
+from dtale_desktop.process_pool import load_data_in_process
+from dtale_desktop.profile_report_modes import ProfileReportMode
+from dtale_desktop.profile_report_queue import ProfileReportQueue
+from dtale_desktop.projection import Projection
 from dtale_desktop.pydantic_utils import BaseApiModel
+from dtale_desktop.refresh_policy import RefreshPolicy
 from dtale_desktop.settings import settings
 from dtale_desktop.source_code_tools import (
     get_source_file,
@@ -29,17 +41,31 @@ from dtale_desktop.source_code_tools import (
     create_data_source_package,
     move_data_source_package,
     load_data_source_package,
+    DataSourcePackage,
 )
-from dtale_desktop.subprocesses import execute_profile_report_builder
 
 logger = get_logger()
 
 _ListPaths = Callable[..., Union[List[str], Awaitable[List[str]]]]
-_GetData = Callable[[str], Union[pd.DataFrame, Awaitable[pd.DataFrame]]]
+_GetData = Callable[[str], Union[Data, Awaitable[Data]]]
 _SaveData = Callable[[str, pd.DataFrame], None]
+_IsStale = Callable[[str, pd.Timestamp], Union[bool, Awaitable[bool]]]
+_GetPreview = Callable[
+    [str, int], Union[Optional[pd.DataFrame], Awaitable[Optional[pd.DataFrame]]]
+]
 
 SOURCES: Dict[str, "DataSource"] = ordereddict()
 
+_DATA_LOADS = SingleFlight()
+
+_DTALE_LAUNCHES = SingleFlight()
+
+PROFILE_REPORTS = ProfileReportQueue(settings.PROFILE_REPORT_WORKERS)
+
+# Futures for anybody waiting on the next profile report (in any mode) for a data_id to finish building.
+# Each one's result is whether that build was cancelled.
+_PROFILE_REPORT_WAITERS: Dict[str, asyncio.Future] = {}
+
 
 class DataSource:
     name: str
@@ -54,6 +80,11 @@ class DataSource:
     _list_paths: _ListPaths
     _get_data: _GetData
     _save_data: Optional[_SaveData]
+    _is_stale: Optional[_IsStale]
+    _get_preview: Optional[_GetPreview]
+    refresh_policy: Optional[RefreshPolicy]
+    compact_dtypes: bool
+    projection: Optional[Projection]
 
     def __init__(
         self,
@@ -63,6 +94,11 @@ class DataSource:
         list_paths: _ListPaths,
         get_data: _GetData,
         save_data: Optional[_SaveData] = None,
+        is_stale: Optional[_IsStale] = None,
+        get_preview: Optional[_GetPreview] = None,
+        refresh_policy: Optional[RefreshPolicy] = None,
+        compact_dtypes: bool = True,
+        projection: Optional[Projection] = None,
         visible: Optional[bool] = True,
         editable: Optional[bool] = True,
         sort_value: Optional[int] = None,
@@ -80,7 +116,15 @@ class DataSource:
             self._list_paths = list_paths
             self._get_data = get_data
             self._save_data = save_data
+            self._is_stale = is_stale
+            self._get_preview = get_preview
+            self.refresh_policy = refresh_policy
+            self.compact_dtypes = compact_dtypes
+            self.projection = projection
             self._path_generator = None
+            self._node_sort_value = 0
+            self._load_nodes_lock = None
+            self._get_data_semaphore = None
             self._validate()
         except Exception as e:
             self.error = str(e)
@@ -90,6 +134,16 @@ class DataSource:
     def id(self) -> str:
         return md5(self.package_path.encode()).hexdigest()
 
+    def _get_data_arguments(self) -> List[str]:
+        """
+        The arguments to get_data, not counting the optional projection keyword arguments.
+        """
+        return [
+            name
+            for name in inspect.signature(self._get_data).parameters
+            if name not in ("columns", "filters")
+        ]
+
     def _validate(self) -> None:
         """
         list_paths and get_data are typically user-provided code, so we run a few basic checks
@@ -101,8 +155,39 @@ class DataSource:
             raise Exception("list_paths must be a function that takes 0 arguments")
         if not inspect.isfunction(self._get_data):
             raise Exception("get_data must be a function")
-        if not len(inspect.signature(self._get_data).parameters) == 1:
-            raise Exception("get_data must be a function that takes 1 argument")
+        if not len(self._get_data_arguments()) == 1:
+            raise Exception(
+                "get_data must be a function that takes 1 argument (plus optional columns/filters)"
+            )
+        if self._is_stale is not None:
+            if not inspect.isfunction(self._is_stale):
+                raise Exception("is_stale must be a function")
+            if not len(inspect.signature(self._is_stale).parameters) == 2:
+                raise Exception("is_stale must be a function that takes 2 arguments")
+        if self._get_preview is not None:
+            if not inspect.isfunction(self._get_preview):
+                raise Exception("get_preview must be a function")
+            if not len(inspect.signature(self._get_preview).parameters) == 2:
+                raise Exception("get_preview must be a function that takes 2 arguments")
+
+    @classmethod
+    def from_package(cls, package: DataSourcePackage, **kwargs) -> "DataSource":
+        """
+        Create a source from a loader package. Any additional kwargs are passed through to the constructor.
+        """
+        return cls(
+            name=package.metadata_module.display_name,
+            package_name=package.package_name,
+            package_path=package.path,
+            list_paths=package.list_paths_module.main,
+            get_data=package.get_data_module.main,
+            is_stale=getattr(package.is_stale_module, "main", None),
+            get_preview=getattr(package.get_preview_module, "main", None),
+            refresh_policy=RefreshPolicy.from_metadata(package.metadata_module),
+            compact_dtypes=getattr(package.metadata_module, "compact_dtypes", True),
+            projection=Projection.from_metadata(package.metadata_module),
+            **kwargs,
+        )
 
     def register(self) -> None:
         """
@@ -133,6 +218,12 @@ class DataSource:
             save_data=""
             if self._save_data is None
             else get_source_file(self._save_data),
+            is_stale=""
+            if self._is_stale is None
+            else get_source_file(self._is_stale),
+            get_preview=""
+            if self._get_preview is None
+            else get_source_file(self._get_preview),
         )
 
     async def _build_path_generator(self):
@@ -140,41 +231,178 @@ class DataSource:
         Adapter that takes whatever code was provided for _list_paths and turns it into a
         generator so we can load nodes in chunks (rather than all at once).
         """
-        if inspect.isgeneratorfunction(self._list_paths) or inspect.isasyncgen(
+        if inspect.isgeneratorfunction(self._list_paths) or inspect.isasyncgenfunction(
             self._list_paths
         ):
             self._path_generator = self._list_paths()
         elif inspect.iscoroutinefunction(self._list_paths):
             self._path_generator = (p for p in await self._list_paths())
         else:
-            self._path_generator = (p for p in self._list_paths())
+            self._path_generator = (p for p in await run_in_thread(self._list_paths))
 
     async def load_nodes(self, limit: Optional[int] = None) -> None:
         """
         Load the next batch of nodes, adding them to self.nodes (or all the nodes, if limit=None)
+        Synchronous list_paths code is run in a worker thread so it doesn't block the event loop.
+        """
+        if self._load_nodes_lock is None:
+            self._load_nodes_lock = asyncio.Lock()
+        async with self._load_nodes_lock:
+            try:
+                if self._path_generator is None:
+                    await self._build_path_generator()
+                if inspect.isasyncgen(self._path_generator):
+                    paths = []
+                    async for path in self._path_generator:
+                        paths.append(path)
+                        if len(paths) == limit:
+                            break
+                else:
+                    paths = await run_in_thread(
+                        lambda: list(islice(self._path_generator, limit))
+                    )
+                # Nodes look up whether they're cached, which is answered from memory.
+                await run_in_thread(fs.manifest.refresh)
+                self._add_nodes(paths)
+                if len(paths) != limit:
+                    self.nodes_fully_loaded = True
+            except Exception as e:
+                self.error = str(e)
+                raise HTTPException(status_code=500, detail=str(e))
+
+    async def call_get_data(self, path: str, data_id: str) -> pd.DataFrame:
+        """
+        Execute the get_data code for a path and write the output to the cache. Synchronous code is run in a
+        worker thread, and the number of concurrent calls per source can be capped with
+        DTALEDESKTOP_SOURCE_CONCURRENCY_LIMIT.
+
+        get_data may return a sequence of chunks (ie be a generator) rather than a DataFrame, in which case
+        they are written to the cache as they're produced and the combined data is then read back from it.
+        Either way the data is converted to more compact dtypes first, if the source uses dtype compaction
+        (chunks are compacted once they've been combined, which already means reading them back).
+        """
+        async with self._get_data_slot():
+            kwargs = (
+                {}
+                if self.projection is None
+                else self.projection.get_data_kwargs(self._get_data)
+            )
+            if inspect.iscoroutinefunction(self._get_data):
+                data = await self._get_data(path, **kwargs)
+            else:
+                data = await run_in_thread(partial(self._get_data, path, **kwargs))
+            if self.projection is not None:
+                data = self.projection.apply(data, kwargs)
+            compact = self.uses_dtype_compaction
+            if compact and isinstance(data, pd.DataFrame):
+                data = await run_in_thread(compact_dtypes, data, data_id)
+                compact = False
+            saved = await run_in_thread(fs.save_data, data_id, data, None, compact)
+        if saved is None:
+            saved = await run_in_thread(fs.read_data, data_id)
+        return saved
+
+    @property
+    def uses_dtype_compaction(self) -> bool:
+        """
+        Data is converted to more compact dtypes before being cached if that's enabled and the source hasn't opted out.
+        """
+        return settings.COMPACT_DTYPES and self.compact_dtypes
+
+    @property
+    def uses_process_pool(self) -> bool:
+        """
+        Synchronous get_data code is executed in the loader process pool, if one is enabled.
+        """
+        return settings.LOADER_PROCESSES is not None and not (
+            inspect.iscoroutinefunction(self._get_data)
+        )
+
+    async def call_get_data_in_process(self, path: str, data_id: str) -> None:
+        """
+        Execute the get_data code in the loader process pool. The worker writes the output
+        directly to the cache rather than sending it back.
         """
+        async with self._get_data_slot():
+            await load_data_in_process(
+                inspect.getsourcefile(self._get_data),
+                path,
+                data_id,
+                self.uses_dtype_compaction,
+                self.projection,
+            )
+
+    def _get_data_slot(self) -> asyncio.Semaphore:
+        if self._get_data_semaphore is None:
+            self._get_data_semaphore = asyncio.Semaphore(
+                settings.SOURCE_CONCURRENCY_LIMIT or sys.maxsize
+            )
+        return self._get_data_semaphore
+
+    async def is_cache_stale(self, path: str, data_id: str) -> bool:
+        """
+        Use the source's is_stale code (if it has any) to check whether the cached data for a path is out of date.
+        """
+        cached_at = fs.data_cached_at(data_id)
+        if self._is_stale is None or cached_at is None:
+            return False
         try:
-            if self._path_generator is None:
-                await self._build_path_generator()
-            count = 0
-            if inspect.isasyncgen(self._path_generator):
-                async for path in self._path_generator:
-                    node = Node(source_id=self.id, path=path)
-                    self.nodes[node.data_id] = node
-                    count += 1
-                    if count == limit:
-                        return
+            if inspect.iscoroutinefunction(self._is_stale):
+                return bool(await self._is_stale(path, cached_at))
             else:
-                for path in self._path_generator:
-                    node = Node(source_id=self.id, path=path)
-                    self.nodes[node.data_id] = node
-                    count += 1
-                    if count == limit:
-                        return
-            self.nodes_fully_loaded = True
+                return bool(await run_in_thread(self._is_stale, path, cached_at))
         except Exception as e:
-            self.error = str(e)
-            raise HTTPException(status_code=500, detail=str(e))
+            # If we can't tell, the cached data is better than nothing.
+            logger.warning(f"is_stale failed for {path}: {e}")
+            return False
+
+    @property
+    def has_preview(self) -> bool:
+        return self._get_preview is not None
+
+    async def call_get_preview(self, path: str, nrows: int) -> Optional[pd.DataFrame]:
+        """
+        Execute the get_preview code for a path, which returns (roughly) the first nrows rows of its data.
+        It may return None if there's no quick way to get a preview of that path.
+        """
+        if inspect.iscoroutinefunction(self._get_preview):
+            data = await self._get_preview(path, nrows)
+        else:
+            data = await run_in_thread(self._get_preview, path, nrows)
+        if data is not None and self.projection is not None:
+            data = self.projection.apply(data, {})
+        return data
+
+    def next_node_sort_value(self) -> int:
+        """
+        Nodes are sorted in the order they were loaded, so this is just a running counter.
+        """
+        self._node_sort_value += 1
+        return self._node_sort_value
+
+    def _add_nodes(self, paths: List[str]) -> None:
+        """
+        Build nodes for a batch of paths and add them to self.nodes.
+        Nodes which already exist (ie they were restored after a restart) are kept, just moved into load order.
+        """
+        for path in paths:
+            data_id = Node.build_data_id(self.id, path, self.projection)
+            if data_id in self.nodes:
+                self.nodes[data_id].sort_value = self.next_node_sort_value()
+                self.nodes.move_to_end(data_id)
+            else:
+                self.add_node(path)
+
+    def add_node(self, path: str) -> "Node":
+        """
+        Get the node for a path, adding it to self.nodes if it hasn't been loaded yet.
+        """
+        data_id = Node.build_data_id(self.id, path, self.projection)
+        if data_id not in self.nodes:
+            self.nodes[data_id] = Node(
+                source_id=self.id, path=path, sort_value=self.next_node_sort_value()
+            )
+        return self.nodes[data_id]
 
     def get_node(self, data_id: str) -> "Node":
         """
@@ -209,6 +437,8 @@ class DataSourceSerialized(BaseApiModel):
     list_paths: str
     get_data: str
     save_data: str = ""
+    is_stale: str = ""
+    get_preview: str = ""
 
     @root_validator(pre=True)
     def validate_package_name(cls, values: dict) -> dict:
@@ -227,17 +457,27 @@ class DataSourceSerialized(BaseApiModel):
         Given a package, attempts to create a new DataSource from it.
         Note that the source won't be registered yet, that needs to be done explicitly.
         """
-        return DataSource(
-            name=package.metadata_module.display_name,
-            package_name=self.package_name,
-            package_path=package.path,
-            list_paths=package.list_paths_module.main,
-            get_data=package.get_data_module.main,
+        return DataSource.from_package(
+            package,
             visible=self.visible,
             editable=self.editable,
             sort_value=self.sort_value,
         )
 
+    def _build_metadata_code(self) -> str:
+        """
+        metadata.py holds the display name along with any optional settings (like a refresh policy).
+        If this source already exists, keep its other settings and just update the display name.
+        """
+        code = ""
+        existing_path = os.path.join(self.package_path or "", "metadata.py")
+        if self.package_path and os.path.exists(existing_path):
+            with open(existing_path) as f:
+                code = re.sub(
+                    r'^display_name = """.*?"""\n?', "", f.read(), flags=re.M | re.S
+                )
+        return f'{code}display_name = """{self.name}"""\n'
+
     def _register_as_new_custom_source(self) -> DataSource:
         """
         Given a name and raw code for list_paths and get_data, attempt to convert it into functioning python
@@ -253,7 +493,9 @@ class DataSourceSerialized(BaseApiModel):
                 self.package_name,
                 list_paths_code=self.list_paths,
                 get_data_code=self.get_data,
-                metadata_code=f'display_name = """{self.name}"""',
+                metadata_code=self._build_metadata_code(),
+                is_stale_code=self.is_stale,
+                get_preview_code=self.get_preview,
             )
             # If the test package works without exceptions, assume that we are good to go - now do it for real.
             self._create_source_from_package(test_package)
@@ -315,6 +557,8 @@ class Node(BaseApiModel):
     visible: bool = True
     sort_value: int
     last_cached_at: Optional[int] = None  # unix timestamp in milliseconds
+    preview: bool = False  # dtale is showing a preview while the full data loads
+    profile_report_error: Optional[str] = None  # why the last profile report failed to build
 
     @root_validator(pre=True)
     def set_computed_values(cls, values: dict) -> dict:
@@ -325,26 +569,33 @@ class Node(BaseApiModel):
         source_id = cls.get_by_name_or_alias(values, "source_id")
 
         if not data_id:
-            m = md5()
-            m.update(source_id.encode())
-            m.update(cls.get_by_name_or_alias(values, "path").encode())
-            data_id = m.hexdigest()
+            data_id = cls.build_data_id(
+                source_id,
+                cls.get_by_name_or_alias(values, "path"),
+                SOURCES[source_id].projection if source_id in SOURCES else None,
+            )
             values["dataId"] = data_id
 
-        if not cls.get_by_name_or_alias(values, "last_cached_at") and fs.data_exists(
-            data_id
-        ):
-            values["lastCachedAt"] = fs.get_file_last_modified(
-                fs.data_path(data_id), format="unix_milliseconds"
-            )
+        if not cls.get_by_name_or_alias(values, "last_cached_at"):
+            values["lastCachedAt"] = fs.data_last_cached_at(data_id)
 
         if not cls.get_by_name_or_alias(values, "sort_value"):
-            existing_nodes = SOURCES[source_id].nodes.values()
-            sort_value = max((0, *(x.sort_value for x in existing_nodes))) + 1
-            values["sortValue"] = sort_value
+            values["sortValue"] = SOURCES[source_id].next_node_sort_value()
 
         return values
 
+    @staticmethod
+    def build_data_id(
+        source_id: str, path: str, projection: Optional[Projection] = None
+    ) -> str:
+        m = md5()
+        m.update(source_id.encode())
+        m.update(path.encode())
+        if projection is not None:
+            # Projected data is cached separately from the full data for the same path.
+            m.update(projection.key.encode())
+        return m.hexdigest()
+
     @property
     def source(self) -> DataSource:
         return SOURCES[self.source_id]
@@ -352,44 +603,131 @@ class Node(BaseApiModel):
     async def get_data(self, ignore_cache=False) -> pd.DataFrame:
         """
         Load the data for this node, also adding it to the cache.
+        Cached data is reused unless the source's is_stale code says it is out of date.
+        Concurrent loads of the same node share a single call to the source's get_data function.
         """
         if fs.data_exists(self.data_id) and not ignore_cache:
-            return fs.read_data(self.data_id)
+            if await self.source.is_cache_stale(self.path, self.data_id):
+                return await self.get_data(ignore_cache=True)
+            try:
+                return await run_in_thread(fs.read_data, self.data_id)
+            except FileNotFoundError:
+                # The cache file was removed by something else, so just load it again.
+                return await self.get_data(ignore_cache=True)
         else:
-            if inspect.iscoroutinefunction(self.source._get_data):
-                data = await self.source._get_data(self.path)
-            else:
-                data = self.source._get_data(self.path)
-            fs.save_data(self.data_id, data)
-            self.last_cached_at = fs.get_file_last_modified(
-                fs.data_path(self.data_id), format="unix_milliseconds"
+            return await _DATA_LOADS.run(self.data_id, self._load_data)
+
+    async def _load_data(self) -> pd.DataFrame:
+        if self.source.uses_process_pool:
+            await self.source.call_get_data_in_process(self.path, self.data_id)
+            data = await run_in_thread(fs.read_data, self.data_id)
+        else:
+            data = await self.source.call_get_data(self.path, self.data_id)
+        self.last_cached_at = fs.data_last_cached_at(self.data_id)
+        return data
+
+    async def refresh_data(self) -> None:
+        """
+        Reload the data from the source, replacing the cached copy and the data in any running dtale instance.
+        """
+        data = await self.get_data(ignore_cache=True)
+        if dtale_app.is_running(self.data_id):
+            await run_in_thread(
+                dtale_app.update_instance_data,
+                data,
+                self.data_id,
+                fs.data_exists(self.data_id),
             )
-            return data
 
     async def launch_dtale(self):
         """
-        Get or start up the dtale instance for this node's data
+        Get or start up the dtale instance for this node's data.
+        Concurrent requests for the same node wait on a single launch.
         """
         try:
-            instance = dtale_app.get_instance(self.data_id)
-            if instance is None:
-                data = await self.get_data()
-                instance = dtale_app.launch_instance(data=data, data_id=self.data_id)
-                self.dtale_url = dtale_app.get_main_url(self.data_id)
-                self.dtale_charts_url = dtale_app.get_charts_url(self.data_id)
-                self.dtale_describe_url = dtale_app.get_describe_url(self.data_id)
-                self.dtale_correlations_url = dtale_app.get_correlations_url(
-                    self.data_id
-                )
-                # Wait for it to be running before we send a response
-                while not instance.is_up():
-                    await asyncio.sleep(1)
-            return instance
+            if dtale_app.is_running(self.data_id):
+                dtale_app.mark_instance_used(self.data_id)
+            else:
+                await _DTALE_LAUNCHES.run(self.data_id, self._launch_dtale)
+            return dtale_app.get_instance(self.data_id)
         except Exception as e:
             # The 'error' attribute set here will be displayed in the front-end
             logger.exception(str(e))
             self.error = str(e)
 
+    async def _get_preview(self) -> Optional[pd.DataFrame]:
+        """
+        If the data isn't cached and the source can provide a preview, get that so dtale can be shown
+        right away. Anything going wrong here just means we wait for the full data instead.
+        """
+        if (
+            settings.PREVIEW_ROWS is None
+            or not self.source.has_preview
+            or fs.data_exists(self.data_id)
+        ):
+            return None
+        try:
+            return await self.source.call_get_preview(self.path, settings.PREVIEW_ROWS)
+        except Exception as e:
+            logger.warning(f"get_preview failed for {self.path}: {e}")
+            return None
+
+    async def _has_fresh_cache(self) -> bool:
+        return fs.data_exists(self.data_id) and not (
+            await self.source.is_cache_stale(self.path, self.data_id)
+        )
+
+    async def _launch_dtale(self) -> None:
+        """
+        Launch dtale with the node's data, or a preview of it if one is available. In that case the caller
+        is responsible for calling load_full_data afterwards.
+        """
+        preview = await self._get_preview()
+        if preview is not None:
+            data = preview
+        elif settings.DTALE_SHARDS and await self._has_fresh_cache():
+            # A dtale worker reads the cache file itself, so there's no need to read it here as well.
+            data = None
+            fs.touch_data(self.data_id)
+        else:
+            data = await self.get_data()
+        # Wait for it to be running before we send a response
+        if not await dtale_app.wait_until_ready(
+            settings.DTALE_STARTUP_TIMEOUT, self.data_id
+        ):
+            raise TimeoutError(
+                f"dtale did not start within {settings.DTALE_STARTUP_TIMEOUT} seconds"
+            )
+        # Full data was just cached (if it wasn't already), so a dtale worker can read it from there.
+        await run_in_thread(
+            dtale_app.launch_instance,
+            data,
+            self.data_id,
+            preview is None and fs.data_exists(self.data_id),
+        )
+        self.preview = preview is not None
+        self.set_dtale_urls()
+
+    async def load_full_data(self) -> None:
+        """
+        Replace the preview being shown by dtale with the full data.
+        """
+        data = await self.get_data()
+        if dtale_app.is_running(self.data_id):
+            await run_in_thread(
+                dtale_app.update_instance_data,
+                data,
+                self.data_id,
+                fs.data_exists(self.data_id),
+            )
+        self.preview = False
+
+    def set_dtale_urls(self) -> None:
+        self.dtale_url = dtale_app.get_main_url(self.data_id)
+        self.dtale_charts_url = dtale_app.get_charts_url(self.data_id)
+        self.dtale_describe_url = dtale_app.get_describe_url(self.data_id)
+        self.dtale_correlations_url = dtale_app.get_correlations_url(self.data_id)
+
     def shut_down(self):
         """
         Shut down the running dtale instance
@@ -403,25 +741,94 @@ class Node(BaseApiModel):
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def build_profile_report(self) -> None:
+    def start_profile_report(
+        self, mode: ProfileReportMode = ProfileReportMode()
+    ) -> Optional[asyncio.Future]:
         """
-        Build a pandas profile report. This is done in a separate process because it can be quite slow.
+        Queue a build of a pandas profile report, unless it already exists. This is done in a separate process
+        because it can be quite slow, and builds wait in a queue so only a few of those processes run at once.
+        Returns a future which is done once the report has been built (or failed, or been cancelled).
         """
+        report_id = mode.report_id(self.data_id)
+        if fs.profile_report_exists(report_id):
+            return None
+        self.profile_report_error = None
+        result = PROFILE_REPORTS.submit(
+            report_id, partial(self._build_profile_report, mode)
+        )
+        result.add_done_callback(self._profile_report_finished)
+        # The worker can do its (slow) imports while the data is being loaded.
+        profile_report_workers.start_worker()
+        return result
+
+    def _profile_report_finished(self, result: asyncio.Future) -> None:
+        if not result.cancelled() and result.exception() is not None:
+            self.profile_report_error = str(result.exception())
+        waiter = _PROFILE_REPORT_WAITERS.pop(self.data_id, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(result.cancelled())
+
+    async def wait_for_profile_report(self) -> None:
+        """
+        Wait until a profile report in any mode exists for this node, or the next one to be built fails
+        (or is cancelled).
+        """
+        if fs.any_profile_report_exists(self.data_id):
+            return
+        waiter = _PROFILE_REPORT_WAITERS.get(self.data_id)
+        if waiter is None:
+            waiter = asyncio.get_event_loop().create_future()
+            _PROFILE_REPORT_WAITERS[self.data_id] = waiter
+        # Shielded, so one waiter going away doesn't cancel it for the others.
+        if await asyncio.shield(waiter):
+            raise HTTPException(
+                status_code=409, detail="The profile report build was cancelled"
+            )
+        if self.profile_report_error is not None:
+            raise HTTPException(status_code=500, detail=self.profile_report_error)
+
+    async def build_profile_report(
+        self, mode: ProfileReportMode = ProfileReportMode()
+    ) -> None:
+        """
+        Build a pandas profile report, waiting until it's finished.
+        """
+        result = self.start_profile_report(mode)
+        if result is None:
+            return
         try:
-            if not fs.profile_report_exists(self.data_id):
-                await self.get_data()
-                await execute_profile_report_builder(
-                    data_path=fs.data_path(self.data_id),
-                    output_path=fs.profile_report_path(self.data_id),
-                    title=f"{self.source.name} - {self.path}",
-                )
-                if not fs.profile_report_exists(self.data_id):
-                    raise Exception(
-                        "The profile report failed to build for some reason"
-                    )
+            # Shielded so a client disconnecting doesn't cancel the build for anybody else waiting on it.
+            await asyncio.shield(result)
+        except asyncio.CancelledError:
+            if not result.cancelled():
+                raise
+            raise HTTPException(
+                status_code=409, detail="The profile report build was cancelled"
+            )
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    async def _build_profile_report(self, mode: ProfileReportMode) -> None:
+        await self.get_data()
+        report_id = mode.report_id(self.data_id)
+        output_path = fs.profile_report_path(report_id)
+        try:
+            await profile_report_workers.build_profile_report(
+                data_path=fs.data_path(self.data_id),
+                output_path=output_path,
+                title=f"{self.source.name} - {self.path}",
+                mode=mode,
+            )
+        except BaseException:
+            # Whatever went wrong (including the worker being killed when the build is cancelled), don't leave
+            # anything behind which could be mistaken for the report.
+            for path in [output_path, *glob(f"{escape(output_path)}.*.tmp")]:
+                fs.delete_file(path)
+            raise
+        fs.register_profile_report(report_id)
+        if not fs.profile_report_exists(report_id):
+            raise Exception("The profile report failed to build for some reason")
+
     async def clear_cache(self) -> None:
         """
         Clear this node's cached data.
@@ -442,15 +849,7 @@ def register_existing_source(
     """
     try:
         package = load_data_source_package(package_path)
-        source = DataSource(
-            name=package.metadata_module.display_name,
-            package_name=package.package_name,
-            package_path=package_path,
-            list_paths=package.list_paths_module.main,
-            get_data=package.get_data_module.main,
-            visible=visible,
-            editable=editable,
-        )
+        source = DataSource.from_package(package, visible=visible, editable=editable)
         source.register()
     except Exception as e:
         logger.exception(str(e))
@@ -0,0 +1,91 @@
+"""
+Optional process pool for executing get_data code.
+
+Parsing files with pandas is usually CPU-bound, so running get_data in threads doesn't let multiple loads
+use more than one core. When DTALEDESKTOP_LOADER_PROCESSES is set, synchronous get_data functions are run
+in a pool of worker processes instead. Rather than pickling the resulting DataFrame back through a pipe,
+the worker writes it straight into the data cache and only sends back the (tiny) manifest entry; the main
+process then reads it from the cache.
+"""
+import asyncio
+import inspect
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from types import ModuleType
+from typing import Dict, Optional, Tuple
+
+from dtale_desktop.cache_manifest import CacheEntry
+from dtale_desktop.file_system import fs
+from dtale_desktop.projection import Projection
+from dtale_desktop.settings import settings
+from dtale_desktop.source_code_tools import load_module_from_path
+
+__all__ = ["load_data_in_process"]
+
+_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+
+# Modules loaded by a worker process, keyed by path and last modified time so edits are picked up.
+_MODULES: Dict[Tuple[str, float], ModuleType] = {}
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        # "spawn" avoids forking a process which already has the dtale server and loader threads running.
+        _PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=settings.LOADER_PROCESSES, mp_context=get_context("spawn")
+        )
+    return _PROCESS_POOL
+
+
+def _load_module(path: str) -> ModuleType:
+    key = (path, os.path.getmtime(path))
+    if key not in _MODULES:
+        _MODULES[key] = load_module_from_path(path)
+    return _MODULES[key]
+
+
+def _load_and_cache_data(
+    get_data_path: str,
+    path: str,
+    data_id: str,
+    compact: bool,
+    projection: Optional[Projection],
+) -> CacheEntry:
+    """
+    Executed in a worker process.
+    """
+    get_data = _load_module(get_data_path).main
+    kwargs = {} if projection is None else projection.get_data_kwargs(get_data)
+    if inspect.iscoroutinefunction(get_data):
+        data = asyncio.run(get_data(path, **kwargs))
+    else:
+        data = get_data(path, **kwargs)
+    if projection is not None:
+        data = projection.apply(data, kwargs)
+    return fs.write_data_file(data_id, data, compact=compact)
+
+
+async def load_data_in_process(
+    get_data_path: str,
+    path: str,
+    data_id: str,
+    compact: bool = False,
+    projection: Optional[Projection] = None,
+) -> None:
+    """
+    Execute the get_data code at get_data_path in a worker process, which writes the output to the cache
+    (applying the projection, and converting it to more compact dtypes if compact is true).
+    """
+    loop = asyncio.get_event_loop()
+    entry = await loop.run_in_executor(
+        _get_process_pool(),
+        _load_and_cache_data,
+        get_data_path,
+        path,
+        data_id,
+        compact,
+        projection,
+    )
+    fs.register_data(entry)
@@ -0,0 +1,57 @@
+"""
+Cheaper ways of building a profile report.
+
+A full pandas-profiling report of a big frame can take a very long time, because of things like the correlations
+and interactions it computes for every pair of columns. The loading page lets you pick how a report is built:
+
+- minimal: pandas-profiling's minimal config, which skips the most expensive parts of the report
+- sampled: the report is built from a random sample of (at most) this many rows
+- columns: the report only covers these columns
+
+These can be combined, and each combination is cached as a separate report next to the full one.
+"""
+from hashlib import md5
+from typing import NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+__all__ = ["ProfileReportMode"]
+
+
+class ProfileReportMode(NamedTuple):
+    minimal: bool = False
+    sample_rows: Optional[int] = None
+    columns: Optional[Tuple[str, ...]] = None
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies the mode in the names of report files. The full report has an empty key, so reports built
+        before modes existed are still found.
+        """
+        parts = []
+        if self.minimal:
+            parts.append("minimal")
+        if self.sample_rows is not None:
+            parts.append(f"sample{self.sample_rows}")
+        if self.columns is not None:
+            digest = md5("\0".join(self.columns).encode()).hexdigest()[:8]
+            parts.append(f"columns{digest}")
+        return "-".join(parts)
+
+    def report_id(self, data_id: str) -> str:
+        """
+        What the report for data_id built in this mode is cached as.
+        """
+        return f"{data_id}.{self.key}" if self.key else data_id
+
+    def apply(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        The part of the data to build the report from.
+        """
+        if self.columns is not None:
+            data = data[[c for c in self.columns if c in data.columns]]
+        if self.sample_rows is not None and len(data) > self.sample_rows:
+            # A fixed seed, so rebuilding the report describes the same rows.
+            data = data.sample(n=self.sample_rows, random_state=0).sort_index()
+        return data
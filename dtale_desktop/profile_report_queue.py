@@ -0,0 +1,114 @@
+"""
+A queue for profile report builds.
+
+Each build runs pandas-profiling in its own process, which can take minutes and a lot of memory for big
+frames, so only DTALEDESKTOP_PROFILE_REPORT_WORKERS of them run at once and the rest wait their turn.
+Requesting a report which is already queued (or being built) waits on the existing job rather than adding
+another one, and a job can be cancelled whether it is still waiting or already running.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+
+from dtale_desktop.logger import get_logger
+
+__all__ = ["ProfileReportQueue"]
+
+logger = get_logger()
+
+
+class _Job(NamedTuple):
+    build: Callable[[], Awaitable[None]]
+    result: asyncio.Future
+
+
+class ProfileReportQueue:
+    workers: int
+    _pending: "OrderedDict[str, _Job]"
+    _running: Dict[str, asyncio.Task]
+    _results: Dict[str, asyncio.Future]
+
+    def __init__(self, workers: int):
+        self.workers = max(workers, 1)
+        self._pending = OrderedDict()
+        self._running = {}
+        self._results = {}
+
+    def submit(
+        self, data_id: str, build: Callable[[], Awaitable[None]]
+    ) -> asyncio.Future:
+        """
+        Queue a build for data_id, unless there already is one. Returns a future for the job's result, which is
+        cancelled if the job is.
+        """
+        if data_id in self._results:
+            return self._results[data_id]
+        result = asyncio.get_event_loop().create_future()
+        # Nobody may be waiting on the result anymore, so make sure a failure doesn't go unretrieved.
+        result.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._results[data_id] = result
+        self._pending[data_id] = _Job(build, result)
+        self._start_next()
+        return result
+
+    def position(self, data_id: str) -> Optional[int]:
+        """
+        0 if the report for data_id is being built, its place in line if it's waiting, or None if it is neither.
+        """
+        if data_id in self._running:
+            return 0
+        for i, pending in enumerate(self._pending):
+            if pending == data_id:
+                return i + 1
+        return None
+
+    def cancel(self, data_id: str) -> bool:
+        """
+        Cancel the job for data_id, returning False if there isn't one.
+        """
+        if data_id in self._running:
+            # The job's result is cancelled once the task has actually stopped.
+            self._running[data_id].cancel()
+            return True
+        job = self._pending.pop(data_id, None)
+        if job is None:
+            return False
+        self._finish(data_id, job.result, cancelled=True)
+        return True
+
+    def _start_next(self) -> None:
+        while self._pending and len(self._running) < self.workers:
+            data_id, job = self._pending.popitem(last=False)
+            task = asyncio.ensure_future(job.build())
+            self._running[data_id] = task
+            task.add_done_callback(
+                lambda t, data_id=data_id, result=job.result: self._on_done(
+                    data_id, result, t
+                )
+            )
+
+    def _on_done(self, data_id: str, result: asyncio.Future, task: asyncio.Task):
+        del self._running[data_id]
+        if task.cancelled():
+            logger.info(f"The profile report build for {data_id} was cancelled")
+            self._finish(data_id, result, cancelled=True)
+        else:
+            self._finish(data_id, result, exception=task.exception())
+        self._start_next()
+
+    def _finish(
+        self,
+        data_id: str,
+        result: asyncio.Future,
+        cancelled: bool = False,
+        exception: Optional[BaseException] = None,
+    ) -> None:
+        del self._results[data_id]
+        if result.done():
+            return
+        if cancelled:
+            result.cancel()
+        elif exception is not None:
+            result.set_exception(exception)
+        else:
+            result.set_result(None)
@@ -0,0 +1,239 @@
+"""
+Long-lived worker processes for building profile reports.
+
+Starting a fresh python process for every report means paying for importing pandas and pandas_profiling
+(which takes several seconds) before any work gets done. Instead reports are built by worker processes
+which do those imports up front and then take jobs over a pipe, one at a time. To stop any memory leaked by
+a build from piling up, a worker exits after DTALEDESKTOP_PROFILE_REPORT_WORKER_MAX_JOBS jobs and a fresh
+one is started in its place straight away, so it has finished its imports by the time the next job comes in.
+
+The profile report queue limits how many builds run at once, so there is never more than that many workers.
+A worker is started as soon as a report is queued (if there's room for another), so it warms up while the
+node's data is loaded.
+"""
+import asyncio
+import gzip
+import os
+import traceback
+from multiprocessing import get_context
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, List, Optional, Tuple
+from uuid import uuid4
+
+from dtale_desktop.profile_report_modes import ProfileReportMode
+from dtale_desktop.settings import settings
+
+__all__ = [
+    "WorkerPool",
+    "build_profile_report",
+    "shut_down_workers",
+    "start_worker",
+    "write_profile_report",
+]
+
+
+def _import_profiling() -> None:
+    import pandas_profiling  # noqa: F401
+
+
+def write_profile_report(
+    data_path: str,
+    output_path: str,
+    title: str,
+    mode: ProfileReportMode = ProfileReportMode(),
+) -> None:
+    from pandas_profiling import ProfileReport
+
+    from dtale_desktop.cache_formats import get_cache_format_for_path
+
+    data = get_cache_format_for_path(data_path).read(data_path)
+    report = ProfileReport(mode.apply(data), title=title, minimal=mode.minimal)
+    # Written to a temporary file first, so a failed build never leaves a partial report at output_path.
+    temp_path = f"{output_path}.{uuid4().hex}.tmp"
+    try:
+        if output_path.endswith(".gz"):
+            # Reports are mostly repetitive html/js, so this shrinks them a lot. It's done here, once,
+            # rather than every time the report is served.
+            with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                f.write(report.to_html())
+        else:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(report.to_html())
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _worker_main(
+    connection: Connection,
+    job: Callable,
+    warmup: Optional[Callable[[], None]],
+    max_jobs: int,
+) -> None:
+    """
+    Executed in a worker process. Each job's result is sent back as ("ok", result) or ("error", traceback).
+    """
+    if warmup is not None:
+        warmup()
+    for _ in range(max_jobs):
+        try:
+            args = connection.recv()
+        except EOFError:
+            # The main process has gone away.
+            return
+        try:
+            connection.send(("ok", job(*args)))
+        except Exception:
+            connection.send(("error", traceback.format_exc()))
+
+
+class _Worker:
+    def __init__(self, pool: "WorkerPool"):
+        # "spawn" avoids forking a process which already has the dtale server and loader threads running.
+        context = get_context("spawn")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_connection, pool.job, pool.warmup, pool.max_jobs),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        self.jobs_left = pool.max_jobs
+
+    async def run(self, args: Tuple) -> Tuple[str, Any]:
+        self.connection.send(args)
+        self.jobs_left -= 1
+        # Wakes up as soon as the result arrives or the process dies (including being killed by stop()).
+        # This uses the default executor rather than the loader threads, since a build can take minutes.
+        await asyncio.get_event_loop().run_in_executor(
+            None, wait, [self.connection, self.process.sentinel]
+        )
+        if not self.connection.poll():
+            self.process.join()
+            raise Exception(
+                f"The worker process exited unexpectedly (exit code {self.process.exitcode})"
+            )
+        return self.connection.recv()
+
+    def stop(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    """
+    Worker processes which each run `warmup` once and then `job` for up to `max_jobs` jobs before being replaced.
+    A job which is cancelled while it's running is stopped by killing its worker.
+    Workers started ahead of time never take the number of workers past `max_workers` (if set).
+    """
+
+    job: Callable
+    warmup: Optional[Callable[[], None]]
+    max_jobs: int
+    max_workers: Optional[int]
+    _idle: List[_Worker]
+    _busy: int
+
+    def __init__(
+        self,
+        job: Callable,
+        warmup: Optional[Callable[[], None]] = None,
+        max_jobs: int = 1,
+        max_workers: Optional[int] = None,
+    ):
+        self.job = job
+        self.warmup = warmup
+        self.max_jobs = max(max_jobs, 1)
+        self.max_workers = max_workers
+        self._idle = []
+        self._busy = 0
+
+    def _get_worker(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.process.is_alive():
+                return worker
+            worker.stop()
+        return _Worker(self)
+
+    def start_worker(self) -> None:
+        """
+        Start a worker ahead of the next job, unless one is already waiting for it
+        or there are already max_workers of them.
+        """
+        for worker in [w for w in self._idle if not w.process.is_alive()]:
+            worker.stop()
+            self._idle.remove(worker)
+        if self._idle:
+            return
+        if self.max_workers is not None and self._busy >= self.max_workers:
+            return
+        self._idle.append(_Worker(self))
+
+    async def run(self, *args) -> Any:
+        worker = self._get_worker()
+        self._busy += 1
+        try:
+            status, result = await worker.run(args)
+        except BaseException:
+            worker.stop()
+            raise
+        finally:
+            self._busy -= 1
+        if worker.jobs_left > 0:
+            self._idle.append(worker)
+        else:
+            # It exits by itself, so start its replacement now to have it warmed up for the next job.
+            worker.stop()
+            self._idle.append(_Worker(self))
+        if status == "error":
+            raise Exception(result)
+        return result
+
+    def shut_down(self) -> None:
+        while self._idle:
+            self._idle.pop().stop()
+
+
+_POOL: Optional[WorkerPool] = None
+
+
+def _get_pool() -> WorkerPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = WorkerPool(
+            write_profile_report,
+            warmup=_import_profiling,
+            max_jobs=settings.PROFILE_REPORT_WORKER_MAX_JOBS,
+            max_workers=settings.PROFILE_REPORT_WORKERS,
+        )
+    return _POOL
+
+
+async def build_profile_report(
+    data_path: str,
+    output_path: str,
+    title: str,
+    mode: ProfileReportMode = ProfileReportMode(),
+) -> None:
+    """
+    Build a profile report using one of the worker processes.
+    """
+    await _get_pool().run(data_path, output_path, title, mode)
+
+
+def start_worker() -> None:
+    """
+    Have a worker ready (or getting ready) for the next report.
+    """
+    _get_pool().start_worker()
+
+
+def shut_down_workers() -> None:
+    if _POOL is not None:
+        _POOL.shut_down()
@@ -0,0 +1,134 @@
+"""
+Loading only some of the columns/rows of a source's data.
+
+A source can declare which columns it needs, and filters for which rows it needs, in its metadata.py:
+
+    columns = ["date", "ticker", "close"]
+
+    # rows matching all of these, in the same format as the filters for pd.read_parquet
+    filters = [("ticker", "in", ["AAPL", "MSFT"]), ("close", ">", 0)]
+
+If get_data takes "columns" and/or "filters" keyword arguments they're passed through, so the get_data code can
+avoid reading anything else (ie pd.read_parquet(path, columns=columns, filters=filters)). Whatever get_data
+doesn't accept is applied to its output instead (chunk by chunk, if it returns chunks), which still keeps the
+unwanted data out of the cache and dtale.
+
+Nodes for a source with a projection get their own data_ids, so changing it never serves stale cached data.
+"""
+import inspect
+import json
+from hashlib import md5
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+__all__ = ["Projection", "filter_rows"]
+
+Filter = Tuple[str, str, Any]
+
+_OPERATORS: Dict[str, Callable[[pd.Series, Any], pd.Series]] = {
+    "==": lambda s, v: s == v,
+    "=": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "in": lambda s, v: s.isin(v),
+    "not in": lambda s, v: ~s.isin(v),
+}
+
+
+def _validate_filters(filters: List[Filter]) -> None:
+    for f in filters:
+        if len(f) != 3 or f[1] not in _OPERATORS:
+            raise ValueError(
+                f"Invalid filter {f!r}, expected (column, operator, value) with an operator in {list(_OPERATORS)}"
+            )
+
+
+def filter_rows(data: pd.DataFrame, filters: Optional[List[Filter]]) -> pd.DataFrame:
+    """
+    The rows of data matching all of the filters.
+    """
+    if not filters:
+        return data
+    mask = pd.Series(True, index=data.index)
+    for column, op, value in filters:
+        mask &= _OPERATORS[op](data[column], value)
+    return data if mask.all() else data[mask]
+
+
+class Projection:
+    columns: Optional[List[str]]
+    filters: Optional[List[Filter]]
+
+    def __init__(
+        self,
+        columns: Optional[List[str]] = None,
+        filters: Optional[List[Filter]] = None,
+    ):
+        self.columns = None if columns is None else list(columns)
+        self.filters = None if filters is None else [tuple(f) for f in filters]
+        if self.columns is None and not self.filters:
+            raise ValueError("A projection needs columns and/or filters")
+        if self.filters:
+            _validate_filters(self.filters)
+
+    @classmethod
+    def from_metadata(cls, metadata_module: ModuleType) -> Optional["Projection"]:
+        columns = getattr(metadata_module, "columns", None)
+        filters = getattr(metadata_module, "filters", None)
+        if columns is None and not filters:
+            return None
+        return cls(columns=columns, filters=filters)
+
+    @property
+    def key(self) -> str:
+        """
+        A digest of the projection, which is combined with a node's path to build its data_id.
+        """
+        return md5(
+            json.dumps([self.columns, self.filters], default=str).encode()
+        ).hexdigest()
+
+    def get_data_kwargs(self, get_data: Callable) -> Dict[str, Any]:
+        """
+        The parts of the projection which get_data accepts as keyword arguments.
+        """
+        parameters = inspect.signature(get_data).parameters
+        kwargs = {}
+        if self.filters and "filters" in parameters:
+            kwargs["filters"] = self.filters
+        if self.columns is not None and "columns" in parameters:
+            columns = self.columns
+            if self.filters and "filters" not in kwargs:
+                # The filters are applied afterwards, so the columns they use have to be loaded too.
+                columns = columns + [
+                    c for c, _, _ in self.filters if c not in self.columns
+                ]
+            kwargs["columns"] = columns
+        return kwargs
+
+    def _apply_to_frame(
+        self, data: pd.DataFrame, get_data_kwargs: Dict[str, Any]
+    ) -> pd.DataFrame:
+        if self.filters and "filters" not in get_data_kwargs:
+            data = filter_rows(data, self.filters)
+        if self.columns is not None and get_data_kwargs.get("columns") != self.columns:
+            data = data[[c for c in self.columns if c in data.columns]]
+        return data
+
+    def apply(
+        self,
+        data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+        get_data_kwargs: Dict[str, Any],
+    ) -> Union[pd.DataFrame, Iterable[pd.DataFrame]]:
+        """
+        Apply whatever get_data didn't already apply (given the kwargs it was called with) to its output.
+        Columns which aren't in the data are ignored.
+        """
+        if isinstance(data, pd.DataFrame):
+            return self._apply_to_frame(data, get_data_kwargs)
+        return (self._apply_to_frame(chunk, get_data_kwargs) for chunk in data)
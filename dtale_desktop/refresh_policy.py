@@ -0,0 +1,78 @@
+"""
+Scheduled refreshing of cached data.
+
+A source can declare a refresh policy in its metadata.py, in which case the data for any of its nodes which
+have been cached will be reloaded in the background (and pushed into running dtale instances) on schedule:
+
+    # reload data once it is more than an hour old
+    refresh_interval = 3600
+
+    # reload data every day at 6:00 and 13:30 (local time)
+    refresh_at = ["06:00", "13:30"]
+
+Both can be specified, in which case data is refreshed whenever either of them says it is due.
+"""
+
+from datetime import datetime, time, timedelta
+from types import ModuleType
+from typing import List, Optional, Union
+
+import pandas as pd
+
+__all__ = ["RefreshPolicy"]
+
+
+def _parse_time(value: Union[str, time]) -> time:
+    if isinstance(value, time):
+        return value
+    hours, minutes = value.split(":")
+    return time(int(hours), int(minutes))
+
+
+class RefreshPolicy:
+    interval: Optional[timedelta]
+    times: List[time]
+
+    def __init__(
+        self,
+        interval: Union[None, int, float, timedelta] = None,
+        times: Optional[List[Union[str, time]]] = None,
+    ):
+        if isinstance(interval, (int, float)):
+            interval = timedelta(seconds=interval)
+        self.interval = interval
+        self.times = sorted(_parse_time(t) for t in (times or []))
+        if self.interval is None and not self.times:
+            raise ValueError("A refresh policy needs an interval and/or times")
+
+    @classmethod
+    def from_metadata(cls, metadata_module: ModuleType) -> Optional["RefreshPolicy"]:
+        interval = getattr(metadata_module, "refresh_interval", None)
+        times = getattr(metadata_module, "refresh_at", None)
+        if interval is None and not times:
+            return None
+        return cls(interval=interval, times=times)
+
+    def _last_scheduled_time(self, now: datetime) -> Optional[datetime]:
+        """
+        The most recent of the daily refresh times which is not after now.
+        """
+        if not self.times:
+            return None
+        for day in (now.date(), now.date() - timedelta(days=1)):
+            for t in reversed(self.times):
+                scheduled = datetime.combine(day, t)
+                if scheduled <= now:
+                    return scheduled
+        return None
+
+    def is_due(self, cached_at: pd.Timestamp, now: Optional[datetime] = None) -> bool:
+        """
+        Whether data which was cached at cached_at should be refreshed now.
+        """
+        now = now or datetime.now()
+        cached_at = cached_at.to_pydatetime()
+        if self.interval is not None and now - cached_at >= self.interval:
+            return True
+        scheduled = self._last_scheduled_time(now)
+        return scheduled is not None and cached_at < scheduled
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Header, Depends
 
+from dtale_desktop import background_tasks
 from dtale_desktop.actions import UpdateNode, SetNodeUpdating
 from dtale_desktop.models import Node, get_node_by_data_id
 from dtale_desktop.settings import settings
@@ -19,6 +20,9 @@ async def node_view_dtale_instance(
     else:
         await node.launch_dtale()
         response = UpdateNode(node=node)
+    if node.preview:
+        background_tasks.start(background_tasks.replace_preview(node))
+    await background_tasks.evict_dtale_instances(keep=[node.data_id])
     return response
 
 
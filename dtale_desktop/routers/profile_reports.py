@@ -1,20 +1,76 @@
 import asyncio
+import gzip
 import os
+from typing import Iterator, List, Optional
 
-from fastapi import Depends, APIRouter, Header
+from fastapi import Depends, APIRouter, Header, Query, Request, Response
 from fastapi.exceptions import HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 
+from dtale_desktop import background_tasks
 from dtale_desktop.actions import UpdateNode, SetNodeUpdating
 from dtale_desktop.file_system import fs
-from dtale_desktop.models import Node, get_node_by_data_id
+from dtale_desktop.models import PROFILE_REPORTS, Node, get_node_by_data_id
+from dtale_desktop.profile_report_modes import ProfileReportMode
+from dtale_desktop.pydantic_utils import BaseApiModel
 from dtale_desktop.settings import settings
 
 router = APIRouter()
 
+# How long (in seconds) a watch request waits for a report before giving up.
+WATCH_TIMEOUT = 600
+
+
+class ProfileReportStatus(BaseApiModel):
+    ready: bool
+    # 0 if the report is being built, its place in the queue if it's waiting, otherwise None.
+    position: Optional[int] = None
+
+
+def get_profile_report_mode(
+    minimal: bool = False,
+    sample_rows: Optional[int] = Query(None, alias="sampleRows", gt=0),
+    columns: Optional[List[str]] = Query(None),
+) -> ProfileReportMode:
+    """
+    Reusable as dependency for reading which mode a report is built in from the query parameters.
+    """
+    return ProfileReportMode(
+        minimal=minimal,
+        sample_rows=sample_rows,
+        columns=None if columns is None else tuple(columns),
+    )
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _decompress(path: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    with gzip.open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _view_url(data_id: str, request: Request) -> str:
+    url = f"/node/view-profile-report/{data_id}/"
+    return f"{url}?{request.url.query}" if request.url.query else url
+
 
 @router.get("/node/profile-report/{data_id}/", response_class=HTMLResponse)
-async def noad_profile_report_loading_page(data_id: str):
+async def noad_profile_report_loading_page(
+    data_id: str,
+    request: Request,
+    mode: ProfileReportMode = Depends(get_profile_report_mode),
+):
     """
     This one is a bit weird because it is being opened in a new tab.
     We do this because building a profile report can take a LONG time, and we don't want to block the main app.
@@ -25,9 +81,12 @@ async def noad_profile_report_loading_page(data_id: str):
     a loading indicator and shoot off a request to /node/build-profile-report/{data_id}/.
     Once the report is built, the response will provide a url for viewing it.
     The promise resolves by redirecting the user to that URL.
+
+    The query parameters select a cheaper mode for building the report (see profile_report_modes.py),
+    and the loading page passes them along to each of those requests.
     """
-    if fs.profile_report_exists(data_id):
-        return RedirectResponse(url=f"/node/view-profile-report/{data_id}/")
+    if fs.profile_report_exists(mode.report_id(data_id)):
+        return RedirectResponse(url=_view_url(data_id, request))
     else:
         with open(
             os.path.join(settings.TEMPLATES_DIR, "loading_profile_report.html"),
@@ -38,19 +97,54 @@ async def noad_profile_report_loading_page(data_id: str):
 
 @router.get("/node/build-profile-report/{data_id}/", response_class=RedirectResponse)
 async def node_build_profile_report(
-    node: Node = Depends(get_node_by_data_id), client_id: int = Header(None)
+    request: Request,
+    node: Node = Depends(get_node_by_data_id),
+    mode: ProfileReportMode = Depends(get_profile_report_mode),
+    client_id: int = Header(None),
 ):
     """
     Build a profile report in the backend.
     Once it's finally ready (which may take a while) the user will be redirected to a page for viewing the report.
     """
-    if settings.ENABLE_WEBSOCKET_CONNECTIONS:
+    queued = PROFILE_REPORTS.position(mode.report_id(node.data_id)) is not None
+    result = node.start_profile_report(mode)
+    if result is not None and not queued and settings.ENABLE_WEBSOCKET_CONNECTIONS:
         await SetNodeUpdating(data_id=node.data_id).broadcast(exclude=[client_id])
-        await node.build_profile_report()
-        await UpdateNode(node=node).broadcast(exclude=[client_id])
-    else:
-        await node.build_profile_report()
-    return RedirectResponse(url=f"/node/view-profile-report/{node.data_id}/")
+        background_tasks.start(
+            background_tasks.broadcast_profile_report_result(node, result)
+        )
+    await node.build_profile_report(mode)
+    return RedirectResponse(url=_view_url(node.data_id, request))
+
+
+@router.get(
+    "/node/profile-report-status/{data_id}/", response_model=ProfileReportStatus
+)
+async def node_profile_report_status(
+    data_id: str, mode: ProfileReportMode = Depends(get_profile_report_mode)
+):
+    """
+    Lets the loading page show where the report is in the build queue.
+    """
+    report_id = mode.report_id(data_id)
+    return ProfileReportStatus(
+        ready=fs.profile_report_exists(report_id),
+        position=PROFILE_REPORTS.position(report_id),
+    )
+
+
+@router.delete("/node/cancel-profile-report/{data_id}/", status_code=204)
+async def node_cancel_profile_report(
+    data_id: str, mode: ProfileReportMode = Depends(get_profile_report_mode)
+):
+    """
+    Cancel a queued or running profile report build.
+    """
+    if not PROFILE_REPORTS.cancel(mode.report_id(data_id)):
+        raise HTTPException(
+            status_code=404, detail="That profile report isn't being built"
+        )
+    return Response(status_code=204)
 
 
 @router.get("/node/watch-profile-report-builder/{data_id}/", response_model=UpdateNode)
@@ -58,21 +152,48 @@ async def node_watch_profile_report_builder(data_id: str):
     """
     Allows the front-end to update the display information once a profile report builds successfully.
     Necessary because the profile report entails opening a separate tab.
+    The report may be built in any mode, since that's picked on the loading page.
+
+    Only used when websocket connections are disabled, otherwise the update is pushed to every client
+    as soon as the build finishes.
     """
-    time_waited = 0
-    while time_waited < 600:
-        if fs.profile_report_exists(data_id):
-            return UpdateNode(node=get_node_by_data_id(data_id))
-        await asyncio.sleep(5)
-        time_waited += 5
-    raise HTTPException(
-        status_code=400, detail="The report either failed to generate or took too long"
-    )
+    node = get_node_by_data_id(data_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail="That node doesn't exist")
+    try:
+        await asyncio.wait_for(node.wait_for_profile_report(), WATCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=400, detail="The report took too long to generate"
+        )
+    return UpdateNode(node=node)
 
 
 @router.get("/node/view-profile-report/{data_id}/", response_class=HTMLResponse)
-async def node_view_profile_report(data_id: str):
+async def node_view_profile_report(
+    data_id: str,
+    request: Request,
+    mode: ProfileReportMode = Depends(get_profile_report_mode),
+):
     """
-    Displays the profile report. These pages can be pretty big, so it can be a bit clunky sometimes.
+    Displays the profile report. These pages can be pretty big, so they're stored gzipped and streamed
+    straight from the file to any browser which accepts that. Browsers have to check whether their copy
+    is still current before using it (since the report could have been rebuilt), which the ETag makes cheap.
     """
-    return fs.read_profile_report(data_id)
+    try:
+        path = fs.get_profile_report_file(mode.report_id(data_id))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="That profile report doesn't exist")
+    stat = os.stat(path)
+    headers = {"ETag": _etag(stat), "Cache-Control": "private, no-cache"}
+    if headers["ETag"] in request.headers.get("If-None-Match", "").split(", "):
+        return Response(status_code=304, headers=headers)
+    if not path.endswith(".gz"):
+        return FileResponse(path, media_type="text/html", headers=headers)
+    headers["Vary"] = "Accept-Encoding"
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(
+            path, media_type="text/html", headers=headers, stat_result=stat
+        )
+    return StreamingResponse(_decompress(path), media_type="text/html", headers=headers)
@@ -2,6 +2,7 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Header
 
+from dtale_desktop import background_tasks
 from dtale_desktop.actions import AddSources, UpdateSource
 from dtale_desktop.models import DataSourceSerialized, DataSourceLayoutChange, SOURCES
 from dtale_desktop.settings import settings
@@ -22,6 +23,21 @@ async def get_source_nodes(source_id: str, limit: Optional[int] = None):
     return response
 
 
+@router.post("/source/{source_id}/warm-cache/", response_model=UpdateSource)
+async def warm_source_cache(source_id: str, pattern: Optional[str] = None):
+    """
+    Load all of a source's nodes and then start caching the data for any which aren't cached yet,
+    optionally only those whose paths match a glob pattern.
+    Progress is reported through SET_NODE_UPDATING/UPDATE_NODE actions if websockets are enabled.
+    """
+    source = SOURCES[source_id]
+    await source.load_nodes()
+    background_tasks.start(
+        background_tasks.warm_cache(background_tasks.uncached_nodes(source, pattern))
+    )
+    return UpdateSource(source=source.serialize())
+
+
 if not settings.DISABLE_ADD_DATA_SOURCES:
 
     @router.post("/source/create/", response_model=AddSources)
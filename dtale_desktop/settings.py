@@ -9,6 +9,68 @@ Environment variables that can be used to configure settings:
 - DTALEDESKTOP_EXCLUDE_DEFAULT_LOADERS:
     "true" if the default loaders should not be included in the list of data sources.
     These are the loaders which look for json, csv, and excel files in your home directory.
+- DTALEDESKTOP_CACHE_FORMAT:
+    "feather", "parquet", or "pickle"; the file format used when caching data. Defaults to "feather".
+    Existing cache files in other formats are migrated to this one the next time they are read.
+- DTALEDESKTOP_UNCOMPRESSED_FEATHER_CACHE:
+    "true" if feather cache files should be written without compression (and read through a memory map).
+    Reading them is faster, since there's nothing to decompress, but they take up more disk space.
+    This doesn't reduce memory usage: the data is still read fully into memory.
+- DTALEDESKTOP_CACHE_MAX_BYTES:
+    integer, the maximum combined size of cached data and profile reports.
+    The least recently accessed files are deleted in the background once it is exceeded.
+- DTALEDESKTOP_CACHE_MAX_FILES:
+    integer, the maximum number of cached data and profile report files. Enforced the same way.
+- DTALEDESKTOP_CACHE_EVICTION_INTERVAL:
+    integer, how often (in seconds) the cache limits are checked. Defaults to 60.
+
+- DTALEDESKTOP_COMPACT_DTYPES:
+    "true" if data should be converted to more compact dtypes (categoricals for repetitive strings, smaller
+    numeric types) before it is cached. A source can opt out with "compact_dtypes = False" in its metadata.py.
+
+- DTALEDESKTOP_LOADER_THREADS:
+    integer, the number of worker threads used to run synchronous list_paths/get_data code and cache I/O.
+    Defaults to python's ThreadPoolExecutor default.
+- DTALEDESKTOP_SOURCE_CONCURRENCY_LIMIT:
+    integer, the maximum number of get_data calls that may run at once for any single data source.
+- DTALEDESKTOP_LOADER_PROCESSES:
+    integer, if set then synchronous get_data code is executed in a pool of this many worker processes.
+    Workers write their output directly to the cache, so DataFrames aren't pickled between processes.
+- DTALEDESKTOP_WARM_CACHE_ON_STARTUP:
+    comma-separated list of data sources (ids, package names or display names, or "all") whose data
+    should be cached in the background when the app starts up.
+- DTALEDESKTOP_WARM_CACHE_CONCURRENCY:
+    integer, how many nodes may be loaded at once when warming or refreshing the cache. Defaults to 4.
+- DTALEDESKTOP_REFRESH_CHECK_INTERVAL:
+    integer, how often (in seconds) to check for nodes due to be refreshed by their source's refresh policy.
+    Defaults to 60.
+- DTALEDESKTOP_PREVIEW_ROWS:
+    integer, if set then nodes whose data isn't cached yet are opened in dtale with (roughly) this many rows,
+    provided their source has a get_preview.py. The full data replaces it once it has loaded.
+
+- DTALEDESKTOP_PROFILE_REPORT_WORKERS:
+    integer, how many profile reports may be built at once. Any others wait in a queue. Defaults to 2.
+
+- DTALEDESKTOP_PROFILE_REPORT_WORKER_MAX_JOBS:
+    integer, reports are built by long-lived worker processes (so pandas_profiling is only imported once), and
+    each one is replaced after building this many reports to limit the effect of memory leaks. Defaults to 10.
+
+- DTALEDESKTOP_DTALE_MAX_MEMORY_BYTES:
+    integer, the maximum combined size (per DataFrame.memory_usage(deep=True)) of the data held by running dtale
+    instances. Once exceeded, the least recently used instances are shut down.
+- DTALEDESKTOP_DTALE_IDLE_TIMEOUT:
+    integer, if set then dtale instances which haven't received any requests for this many seconds are shut down.
+- DTALEDESKTOP_DTALE_STARTUP_TIMEOUT:
+    integer, how long (in seconds) to wait for dtale to be up before reporting an error. Defaults to 30.
+- DTALEDESKTOP_DTALE_SHARDS:
+    integer, if set then dtale instances are served by this many worker processes (on consecutive ports starting
+    at DTALEDESKTOP_DTALE_PORT) instead of a thread in the main process. Each node is always served by the same one.
+    If DTALEDESKTOP_DTALE_ROOT_URL is also set, "{shard}" in it is replaced by the worker's index.
+- DTALEDESKTOP_RESTORE_DTALE_INSTANCES:
+    "true" if the dtale instances running at shutdown (and their settings) should be restored on startup.
+- DTALEDESKTOP_EAGER_RESTORE_COUNT:
+    integer, how many of the most recently used instances are restored in the background on startup. The rest
+    are restored the first time they're requested. Defaults to 5.
 
 - DTALEDESKTOP_DISABLE_ADD_DATA_SOURCES:
     "true" if the "Add Data Source" button should not be shown.
@@ -71,6 +133,27 @@ class EnvVars(str, Enum):
     ROOT_DIR = "DTALEDESKTOP_ROOT_DIR"
     ADDITIONAL_LOADERS_DIRS = "DTALEDESKTOP_ADDITIONAL_LOADERS_DIRS"
     EXCLUDE_DEFAULT_LOADERS = "DTALEDESKTOP_EXCLUDE_DEFAULT_LOADERS"
+    CACHE_FORMAT = "DTALEDESKTOP_CACHE_FORMAT"
+    UNCOMPRESSED_FEATHER_CACHE = "DTALEDESKTOP_UNCOMPRESSED_FEATHER_CACHE"
+    CACHE_MAX_BYTES = "DTALEDESKTOP_CACHE_MAX_BYTES"
+    CACHE_MAX_FILES = "DTALEDESKTOP_CACHE_MAX_FILES"
+    CACHE_EVICTION_INTERVAL = "DTALEDESKTOP_CACHE_EVICTION_INTERVAL"
+    COMPACT_DTYPES = "DTALEDESKTOP_COMPACT_DTYPES"
+    LOADER_THREADS = "DTALEDESKTOP_LOADER_THREADS"
+    SOURCE_CONCURRENCY_LIMIT = "DTALEDESKTOP_SOURCE_CONCURRENCY_LIMIT"
+    LOADER_PROCESSES = "DTALEDESKTOP_LOADER_PROCESSES"
+    WARM_CACHE_ON_STARTUP = "DTALEDESKTOP_WARM_CACHE_ON_STARTUP"
+    WARM_CACHE_CONCURRENCY = "DTALEDESKTOP_WARM_CACHE_CONCURRENCY"
+    REFRESH_CHECK_INTERVAL = "DTALEDESKTOP_REFRESH_CHECK_INTERVAL"
+    PREVIEW_ROWS = "DTALEDESKTOP_PREVIEW_ROWS"
+    PROFILE_REPORT_WORKERS = "DTALEDESKTOP_PROFILE_REPORT_WORKERS"
+    PROFILE_REPORT_WORKER_MAX_JOBS = "DTALEDESKTOP_PROFILE_REPORT_WORKER_MAX_JOBS"
+    DTALE_MAX_MEMORY_BYTES = "DTALEDESKTOP_DTALE_MAX_MEMORY_BYTES"
+    DTALE_IDLE_TIMEOUT = "DTALEDESKTOP_DTALE_IDLE_TIMEOUT"
+    DTALE_STARTUP_TIMEOUT = "DTALEDESKTOP_DTALE_STARTUP_TIMEOUT"
+    DTALE_SHARDS = "DTALEDESKTOP_DTALE_SHARDS"
+    RESTORE_DTALE_INSTANCES = "DTALEDESKTOP_RESTORE_DTALE_INSTANCES"
+    EAGER_RESTORE_COUNT = "DTALEDESKTOP_EAGER_RESTORE_COUNT"
 
     DISABLE_ADD_DATA_SOURCES = "DTALEDESKTOP_DISABLE_ADD_DATA_SOURCES"
     DISABLE_EDIT_DATA_SOURCES = "DTALEDESKTOP_DISABLE_EDIT_DATA_SOURCES"
@@ -110,6 +193,27 @@ class _Settings:
     ROOT_DIR: str
     ADDITIONAL_LOADERS_DIRS: List[str]
     EXCLUDE_DEFAULT_LOADERS: bool
+    CACHE_FORMAT: str
+    UNCOMPRESSED_FEATHER_CACHE: bool
+    CACHE_MAX_BYTES: Optional[int]
+    CACHE_MAX_FILES: Optional[int]
+    CACHE_EVICTION_INTERVAL: int
+    COMPACT_DTYPES: bool
+    LOADER_THREADS: Optional[int]
+    SOURCE_CONCURRENCY_LIMIT: Optional[int]
+    LOADER_PROCESSES: Optional[int]
+    WARM_CACHE_ON_STARTUP: List[str]
+    WARM_CACHE_CONCURRENCY: int
+    REFRESH_CHECK_INTERVAL: int
+    PREVIEW_ROWS: Optional[int]
+    PROFILE_REPORT_WORKERS: int
+    PROFILE_REPORT_WORKER_MAX_JOBS: int
+    DTALE_MAX_MEMORY_BYTES: Optional[int]
+    DTALE_IDLE_TIMEOUT: Optional[int]
+    DTALE_STARTUP_TIMEOUT: int
+    DTALE_SHARDS: Optional[int]
+    RESTORE_DTALE_INSTANCES: bool
+    EAGER_RESTORE_COUNT: int
 
     REACT_APP_DIR: str
     TEMPLATES_DIR: str
@@ -162,6 +266,33 @@ class _Settings:
             if x != ""
         ]
         self.EXCLUDE_DEFAULT_LOADERS = _env_bool(EnvVars.EXCLUDE_DEFAULT_LOADERS)
+        self.CACHE_FORMAT = os.getenv(EnvVars.CACHE_FORMAT, "feather").lower()
+        self.UNCOMPRESSED_FEATHER_CACHE = _env_bool(EnvVars.UNCOMPRESSED_FEATHER_CACHE)
+        self.CACHE_MAX_BYTES = _env_int(EnvVars.CACHE_MAX_BYTES, None)
+        self.CACHE_MAX_FILES = _env_int(EnvVars.CACHE_MAX_FILES, None)
+        self.CACHE_EVICTION_INTERVAL = _env_int(EnvVars.CACHE_EVICTION_INTERVAL, 60)
+        self.COMPACT_DTYPES = _env_bool(EnvVars.COMPACT_DTYPES)
+        self.LOADER_THREADS = _env_int(EnvVars.LOADER_THREADS, None)
+        self.SOURCE_CONCURRENCY_LIMIT = _env_int(EnvVars.SOURCE_CONCURRENCY_LIMIT, None)
+        self.LOADER_PROCESSES = _env_int(EnvVars.LOADER_PROCESSES, None)
+        self.WARM_CACHE_ON_STARTUP = [
+            x
+            for x in os.getenv(EnvVars.WARM_CACHE_ON_STARTUP, "").split(",")
+            if x != ""
+        ]
+        self.WARM_CACHE_CONCURRENCY = _env_int(EnvVars.WARM_CACHE_CONCURRENCY, 4)
+        self.REFRESH_CHECK_INTERVAL = _env_int(EnvVars.REFRESH_CHECK_INTERVAL, 60)
+        self.PREVIEW_ROWS = _env_int(EnvVars.PREVIEW_ROWS, None)
+        self.PROFILE_REPORT_WORKERS = _env_int(EnvVars.PROFILE_REPORT_WORKERS, 2)
+        self.PROFILE_REPORT_WORKER_MAX_JOBS = _env_int(
+            EnvVars.PROFILE_REPORT_WORKER_MAX_JOBS, 10
+        )
+        self.DTALE_MAX_MEMORY_BYTES = _env_int(EnvVars.DTALE_MAX_MEMORY_BYTES, None)
+        self.DTALE_IDLE_TIMEOUT = _env_int(EnvVars.DTALE_IDLE_TIMEOUT, None)
+        self.DTALE_STARTUP_TIMEOUT = _env_int(EnvVars.DTALE_STARTUP_TIMEOUT, 30)
+        self.DTALE_SHARDS = _env_int(EnvVars.DTALE_SHARDS, None)
+        self.RESTORE_DTALE_INSTANCES = _env_bool(EnvVars.RESTORE_DTALE_INSTANCES)
+        self.EAGER_RESTORE_COUNT = _env_int(EnvVars.EAGER_RESTORE_COUNT, 5)
 
         self.REACT_APP_DIR = os.path.join(
             os.path.dirname(os.path.abspath(__file__)), "frontend", "build"
@@ -42,11 +42,17 @@ class DataSourcePackage(BaseModel):
     list_paths_module: ModuleType
     get_data_module: ModuleType
     metadata_module: ModuleType
+    is_stale_module: Optional[ModuleType] = None
+    get_preview_module: Optional[ModuleType] = None
 
     class Config:
         arbitrary_types_allowed = True
 
 
+def _load_optional_module(path: str) -> Optional[ModuleType]:
+    return load_module_from_path(path) if os.path.exists(path) else None
+
+
 def load_data_source_package(
     path: str, package_name: Optional[str] = None
 ) -> DataSourcePackage:
@@ -57,6 +63,8 @@ def load_data_source_package(
         list_paths_module=load_module_from_path(os.path.join(path, "list_paths.py")),
         get_data_module=load_module_from_path(os.path.join(path, "get_data.py")),
         metadata_module=load_module_from_path(os.path.join(path, "metadata.py")),
+        is_stale_module=_load_optional_module(os.path.join(path, "is_stale.py")),
+        get_preview_module=_load_optional_module(os.path.join(path, "get_preview.py")),
     )
 
 
@@ -66,12 +74,18 @@ def create_data_source_package(
     list_paths_code: str,
     get_data_code: str,
     metadata_code: str,
+    is_stale_code: str = "",
+    get_preview_code: str = "",
 ) -> DataSourcePackage:
     path = os.path.join(directory, package_name)
     fs.create_python_package(path)
     fs.create_file(os.path.join(path, "list_paths.py"), list_paths_code)
     fs.create_file(os.path.join(path, "get_data.py"), get_data_code)
     fs.create_file(os.path.join(path, "metadata.py"), metadata_code)
+    if is_stale_code:
+        fs.create_file(os.path.join(path, "is_stale.py"), is_stale_code)
+    if get_preview_code:
+        fs.create_file(os.path.join(path, "get_preview.py"), get_preview_code)
     return load_data_source_package(path, package_name)
 
 
@@ -1,4 +1,5 @@
 import asyncio
+import os
 import subprocess
 import sys
 from argparse import ArgumentParser
@@ -36,29 +37,70 @@ def open_browser():
 
 
 def build_profile_report():
-    import pandas as pd
-    from pandas_profiling import ProfileReport
+    from dtale_desktop.profile_report_modes import ProfileReportMode
+    from dtale_desktop.profile_report_workers import write_profile_report
 
     parser = ArgumentParser()
     parser.add_argument("data_path", type=str)
     parser.add_argument("output_path", type=str)
     parser.add_argument("title", type=str)
+    parser.add_argument("--minimal", action="store_true")
+    parser.add_argument("--sample-rows", type=int, default=None)
+    parser.add_argument("--columns", type=str, nargs="+", default=None)
     args = parser.parse_args()
 
-    data = pd.read_pickle(args.data_path)
-    report = ProfileReport(data, title=args.title)
-    report.to_file(args.output_path)
+    mode = ProfileReportMode(
+        minimal=args.minimal,
+        sample_rows=args.sample_rows,
+        columns=None if args.columns is None else tuple(args.columns),
+    )
+    write_profile_report(args.data_path, args.output_path, args.title, mode)
     sys.exit(0)
 
 
+def warm_cache():
+    parser = ArgumentParser(
+        description="Cache the data for data sources so it's ready when they are opened."
+    )
+    parser.add_argument(
+        "sources",
+        type=str,
+        nargs="*",
+        default=["all"],
+        help="ids, package names or display names of the sources to warm (default: all)",
+    )
+    parser.add_argument(
+        "--pattern", type=str, default=None, help="only warm paths matching this glob"
+    )
+    args = parser.parse_args()
+
+    from dtale_desktop.app import register_any_existing_sources
+    from dtale_desktop.background_tasks import find_sources, warm_source_caches
+
+    register_any_existing_sources()
+    sources = find_sources(args.sources)
+    if not sources:
+        sys.exit("No matching data sources were found.")
+    asyncio.run(warm_source_caches(sources, args.pattern))
+    sys.exit(0)
+
+
+def run_dtale_shard():
+    from dtale_desktop.dtale_shard import run_shard
+
+    parser = ArgumentParser()
+    parser.add_argument("port", type=int)
+    run_shard(parser.parse_args().port)
+
+
 def launch_browser_opener(url: str) -> None:
     subprocess.Popen(["dtaledesktop_open_browser", url])
 
 
-async def execute_profile_report_builder(
-    data_path: str, output_path: str, title: str
-) -> None:
-    args = ["dtaledesktop_profile_report", data_path, output_path, title]
-    builder = subprocess.Popen(args)
-    while builder.poll() is None:
-        await asyncio.sleep(1)
+def launch_dtale_shard(port: int, secret: str) -> subprocess.Popen:
+    from dtale_desktop.dtale_shard import SECRET_ENV_VAR
+
+    return subprocess.Popen(
+        ["dtaledesktop_dtale_shard", str(port)],
+        env={**os.environ, SECRET_ENV_VAR: secret},
+    )
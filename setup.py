@@ -26,6 +26,7 @@ install_requires = [
     "aiohttp",
     "typing_extensions",
     "pandas-profiling",
+    "pyarrow",
 ]
 
 setup(
@@ -55,6 +56,8 @@ setup(
             "dtaledesktop = dtale_desktop.app:run",
             "dtaledesktop_open_browser = dtale_desktop.subprocesses:open_browser",
             "dtaledesktop_profile_report = dtale_desktop.subprocesses:build_profile_report",
+            "dtaledesktop_warm_cache = dtale_desktop.subprocesses:warm_cache",
+            "dtaledesktop_dtale_shard = dtale_desktop.subprocesses:run_dtale_shard",
         ]
     },
     classifiers=classifiers,
@@ -119,3 +119,824 @@ def test_load_source_nodes(app, client):
 
     after_three = client.get(f"/source/{source.id}/load-nodes/").json()["source"]
     assert after_three == after_two
+
+
+def test_node_sort_values_follow_load_order(app, client):
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post("/source/create/", json=_mock_source_json).json()[
+        "sources"
+    ][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=10")
+    client.get(f"/source/{source_id}/load-nodes/")
+    nodes = list(SOURCES[source_id].nodes.values())
+    assert [node.sort_value for node in nodes] == list(range(1, len(nodes) + 1))
+    assert [node.path for node in nodes] == [str(x) for x in range(99)]
+
+
+def test_cache_eviction_updates_nodes(app, client, monkeypatch, execute_async_task):
+    from dtale_desktop import background_tasks
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post("/source/create/", json=_mock_source_json).json()[
+        "sources"
+    ][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=1")
+    node = next(iter(SOURCES[source_id].nodes.values()))
+    execute_async_task(node.get_data())
+    assert node.last_cached_at is not None
+
+    report_id = f"{node.data_id}.minimal"
+    app.fs.create_file(app.fs.profile_report_path(report_id), "<html></html>")
+    app.fs.register_profile_report(report_id)
+
+    looked_up = []
+    get_node_by_data_id = background_tasks.get_node_by_data_id
+    monkeypatch.setattr(
+        background_tasks,
+        "get_node_by_data_id",
+        lambda data_id: looked_up.append(data_id) or get_node_by_data_id(data_id),
+    )
+    monkeypatch.setattr(app.settings, "CACHE_MAX_FILES", 0)
+    execute_async_task(background_tasks.evict_cached_files())
+    assert node.last_cached_at is None
+    assert not app.fs.data_exists(node.data_id)
+    assert not app.fs.profile_report_exists(report_id)
+    # The report's node is looked up by its data_id, not the id of the report.
+    assert looked_up == [node.data_id]
+
+
+_slow_get_data_sample = """
+import asyncio
+import pandas as pd
+
+calls = []
+
+async def main(path: str):
+    calls.append(path)
+    await asyncio.sleep(0.1)
+    return pd.DataFrame({"foo": [1, 2], "bar": [3, 4]})
+"""
+
+
+def test_concurrent_get_data_calls_are_coalesced(app, client, execute_async_task):
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post(
+        "/source/create/",
+        json={**_mock_source_json, "name": "slow", "getData": _slow_get_data_sample},
+    ).json()["sources"][0]["id"]
+    source = SOURCES[source_id]
+    client.get(f"/source/{source_id}/load-nodes/?limit=1")
+    node = next(iter(source.nodes.values()))
+
+    async def load_concurrently():
+        return await asyncio.gather(*(node.get_data() for _ in range(5)))
+
+    results = execute_async_task(load_concurrently())
+    assert source._get_data.__globals__["calls"] == [node.path]
+    assert all(result is results[0] for result in results)
+    assert not any(name.endswith(".tmp") for name in os.listdir(app.fs.DATA_DIR))
+
+
+_threaded_get_data_sample = """
+import threading
+import pandas as pd
+
+threads = []
+
+def main(path: str):
+    threads.append(threading.current_thread().name)
+    return pd.DataFrame({"foo": [1, 2], "bar": [3, 4]})
+"""
+
+
+def test_sync_get_data_runs_in_loader_thread(app, client, execute_async_task):
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post(
+        "/source/create/",
+        json={
+            **_mock_source_json,
+            "name": "threaded",
+            "getData": _threaded_get_data_sample,
+        },
+    ).json()["sources"][0]["id"]
+    source = SOURCES[source_id]
+    client.get(f"/source/{source_id}/load-nodes/?limit=1")
+    node = next(iter(source.nodes.values()))
+
+    execute_async_task(node.get_data(ignore_cache=True))
+    threads = source._get_data.__globals__["threads"]
+    assert len(threads) == 1
+    assert threads[0].startswith("dtaledesktop-loader")
+
+
+_pid_get_data_sample = """
+import os
+import pandas as pd
+
+def main(path: str):
+    return pd.DataFrame({"pid": [os.getpid()]})
+"""
+
+
+def test_get_data_in_process_pool(app, client, monkeypatch, execute_async_task):
+    from dtale_desktop.file_system import fs
+    from dtale_desktop.models import SOURCES
+
+    monkeypatch.setattr(app.settings, "LOADER_PROCESSES", 1)
+    # Worker processes build their settings from the environment.
+    monkeypatch.setenv("DTALEDESKTOP_ROOT_DIR", fs.ROOT_DIR)
+
+    source_id = client.post(
+        "/source/create/",
+        json={**_mock_source_json, "name": "pids", "getData": _pid_get_data_sample},
+    ).json()["sources"][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=1")
+    node = next(iter(SOURCES[source_id].nodes.values()))
+
+    data = execute_async_task(node.get_data())
+    assert data["pid"].iloc[0] != os.getpid()
+    assert fs.data_exists(node.data_id)
+    assert node.last_cached_at == fs.data_last_cached_at(node.data_id)
+
+
+def test_warm_source_cache(app):
+    import time
+    from dtale_desktop.models import SOURCES
+
+    with TestClient(app.app) as client:
+        source_id = client.post(
+            "/source/create/", json={**_mock_source_json, "name": "warm"}
+        ).json()["sources"][0]["id"]
+        response = client.post(f"/source/{source_id}/warm-cache/?pattern=1*")
+        assert response.status_code == 200
+        assert response.json()["source"]["nodesFullyLoaded"] is True
+
+        expected = {
+            n.data_id
+            for n in SOURCES[source_id].nodes.values()
+            if n.path.startswith("1")
+        }
+        for _ in range(50):
+            if all(app.fs.data_exists(data_id) for data_id in expected):
+                break
+            time.sleep(0.1)
+        for node in SOURCES[source_id].nodes.values():
+            assert app.fs.data_exists(node.data_id) == (node.data_id in expected)
+            assert (node.last_cached_at is not None) == (node.data_id in expected)
+
+
+_counting_get_data_sample = """
+import pandas as pd
+
+calls = []
+
+def main(path: str):
+    calls.append(path)
+    return pd.DataFrame({"foo": [1, 2], "bar": [3, 4]})
+"""
+
+_is_stale_sample = """
+def main(path, cached_at):
+    return path == "0"
+"""
+
+
+def test_stale_cache_is_reloaded(app, client, execute_async_task):
+    from dtale_desktop.models import SOURCES
+
+    source = client.post(
+        "/source/create/",
+        json={
+            **_mock_source_json,
+            "name": "stale",
+            "getData": _counting_get_data_sample,
+            "isStale": _is_stale_sample,
+        },
+    ).json()["sources"][0]
+    assert source["isStale"] == _is_stale_sample
+    source = SOURCES[source["id"]]
+    client.get(f"/source/{source.id}/load-nodes/?limit=2")
+    stale, fresh = source.nodes.values()
+
+    for _ in range(2):
+        execute_async_task(stale.get_data())
+        execute_async_task(fresh.get_data())
+    assert source._get_data.__globals__["calls"] == ["0", "1", "0"]
+
+
+_chunked_get_data_sample = """
+import pandas as pd
+
+def main(path: str):
+    yield pd.DataFrame({"foo": [1, 2], "bar": [3, 4]})
+    yield pd.DataFrame({"foo": [5], "bar": [6]})
+"""
+
+
+def test_chunked_get_data(app, client, execute_async_task):
+    import pandas as pd
+    from dtale_desktop.file_system import fs
+    from dtale_desktop.models import SOURCES
+
+    source = client.post(
+        "/source/create/",
+        json={
+            **_mock_source_json,
+            "name": "chunked",
+            "getData": _chunked_get_data_sample,
+        },
+    ).json()["sources"][0]
+    client.get(f"/source/{source['id']}/load-nodes/?limit=1")
+    (node,) = SOURCES[source["id"]].nodes.values()
+
+    expected = pd.DataFrame({"foo": [1, 2, 5], "bar": [3, 4, 6]})
+    pd.testing.assert_frame_equal(execute_async_task(node.get_data()), expected)
+    pd.testing.assert_frame_equal(fs.read_data(node.data_id), expected)
+
+
+def test_compact_dtypes(app, client, monkeypatch, execute_async_task):
+    from dtale_desktop.models import SOURCES
+
+    monkeypatch.setattr(app.settings, "COMPACT_DTYPES", True)
+    source = SOURCES[
+        client.post(
+            "/source/create/", json={**_mock_source_json, "name": "compact"}
+        ).json()["sources"][0]["id"]
+    ]
+    client.get(f"/source/{source.id}/load-nodes/?limit=2")
+    compacted, opted_out = source.nodes.values()
+
+    assert execute_async_task(compacted.get_data())["foo"].dtype == "int8"
+    source.compact_dtypes = False
+    assert execute_async_task(opted_out.get_data())["foo"].dtype == "int64"
+
+
+_projected_get_data_sample = """
+import pandas as pd
+
+calls = []
+
+def main(path: str, columns=None):
+    calls.append(columns)
+    data = pd.DataFrame({"foo": [1, 2], "bar": [3, 4], "baz": [5, 6]})
+    return data if columns is None else data[columns]
+"""
+
+
+@pytest.mark.parametrize(
+    "name,get_data",
+    [
+        ("projection", _get_data_sample),
+        ("pushed down projection", _projected_get_data_sample),
+    ],
+)
+def test_projection(app, client, execute_async_task, name, get_data):
+    import pandas as pd
+    from dtale_desktop.models import SOURCES, Node
+    from dtale_desktop.projection import Projection
+
+    source = SOURCES[
+        client.post(
+            "/source/create/",
+            json={**_mock_source_json, "name": name, "getData": get_data},
+        ).json()["sources"][0]["id"]
+    ]
+    source.projection = Projection(columns=["foo"], filters=[("bar", ">", 3)])
+    client.get(f"/source/{source.id}/load-nodes/?limit=1")
+    (node,) = source.nodes.values()
+    assert node.data_id != Node.build_data_id(source.id, node.path)
+
+    data = execute_async_task(node.get_data())
+    pd.testing.assert_frame_equal(
+        data.reset_index(drop=True), pd.DataFrame({"foo": [2]})
+    )
+    if get_data == _projected_get_data_sample:
+        assert source._get_data.__globals__["calls"] == [["foo", "bar"]]
+
+
+def test_refresh_policy():
+    from datetime import datetime
+    import pandas as pd
+    from dtale_desktop.refresh_policy import RefreshPolicy
+
+    now = datetime(2020, 1, 2, 12, 0)
+    hourly = RefreshPolicy(interval=3600)
+    assert hourly.is_due(pd.Timestamp("2020-01-02 10:59"), now)
+    assert not hourly.is_due(pd.Timestamp("2020-01-02 11:30"), now)
+
+    daily = RefreshPolicy(times=["06:00", "13:30"])
+    assert daily.is_due(pd.Timestamp("2020-01-02 05:00"), now)
+    assert not daily.is_due(pd.Timestamp("2020-01-02 06:30"), now)
+    assert daily.is_due(pd.Timestamp("2020-01-01 13:00"), datetime(2020, 1, 2, 5))
+    assert not daily.is_due(pd.Timestamp("2020-01-01 14:00"), datetime(2020, 1, 2, 5))
+
+    with pytest.raises(ValueError):
+        RefreshPolicy()
+
+
+def test_scheduled_refresh(app, client, execute_async_task, monkeypatch):
+    from dtale_desktop import background_tasks
+    from dtale_desktop.models import SOURCES
+    from dtale_desktop.refresh_policy import RefreshPolicy
+
+    source_id = client.post(
+        "/source/create/",
+        json={
+            **_mock_source_json,
+            "name": "refresh",
+            "getData": _counting_get_data_sample,
+        },
+    ).json()["sources"][0]["id"]
+    source = SOURCES[source_id]
+    client.get(f"/source/{source_id}/load-nodes/?limit=2")
+    cached, uncached = source.nodes.values()
+    execute_async_task(cached.get_data())
+
+    assert background_tasks.nodes_due_for_refresh(source) == []
+    monkeypatch.setattr(source, "refresh_policy", RefreshPolicy(interval=0))
+    assert background_tasks.nodes_due_for_refresh(source) == [cached]
+
+    execute_async_task(background_tasks.refresh_due_nodes())
+    assert source._get_data.__globals__["calls"] == ["0", "0"]
+    assert cached.error is None
+
+
+def test_edit_source_keeps_metadata(app, client):
+    from dtale_desktop.models import SOURCES
+
+    source = client.post(
+        "/source/create/", json={**_mock_source_json, "name": "before"}
+    ).json()["sources"][0]
+    metadata_path = os.path.join(source["packagePath"], "metadata.py")
+    with open(metadata_path, "a") as f:
+        f.write("refresh_interval = 60\n")
+
+    client.post("/source/update/", json={**source, "name": "after"})
+    assert SOURCES[source["id"]].name == "after"
+    assert SOURCES[source["id"]].refresh_policy.interval.total_seconds() == 60
+
+
+def test_dtale_instances_evicted_over_memory_budget(
+    app, client, monkeypatch, execute_async_task
+):
+    from dtale_desktop import background_tasks, dtale_app
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post(
+        "/source/create/", json={**_mock_source_json, "name": "memory"}
+    ).json()["sources"][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=2")
+    old, new = SOURCES[source_id].nodes.values()
+    for node in (old, new):
+        data = execute_async_task(node.get_data())
+        dtale_app.launch_instance(data=data, data_id=node.data_id)
+        node.dtale_url = dtale_app.get_main_url(node.data_id)
+
+    monkeypatch.setattr(
+        app.settings, "DTALE_MAX_MEMORY_BYTES", dtale_app.instances_memory_usage() - 1
+    )
+    execute_async_task(background_tasks.evict_dtale_instances(keep=[new.data_id]))
+    assert old.dtale_url is None and dtale_app.get_instance(old.data_id) is None
+    assert new.dtale_url is not None and dtale_app.get_instance(new.data_id) is not None
+
+
+def test_idle_dtale_instances_are_reaped(app, client, monkeypatch, execute_async_task):
+    from dtale_desktop import background_tasks, dtale_app
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post(
+        "/source/create/", json={**_mock_source_json, "name": "idle"}
+    ).json()["sources"][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=1")
+    node = next(iter(SOURCES[source_id].nodes.values()))
+    data = execute_async_task(node.get_data())
+    dtale_app.launch_instance(data=data, data_id=node.data_id)
+    node.dtale_url = dtale_app.get_main_url(node.data_id)
+
+    monkeypatch.setattr(app.settings, "DTALE_IDLE_TIMEOUT", 60)
+    execute_async_task(background_tasks.reap_idle_dtale_instances())
+    assert node.dtale_url is not None
+
+    monkeypatch.setattr(app.settings, "DTALE_IDLE_TIMEOUT", -1)
+    execute_async_task(background_tasks.reap_idle_dtale_instances())
+    assert node.dtale_url is None and dtale_app.get_instance(node.data_id) is None
+
+
+def test_failed_dtale_shut_down_does_not_stop_the_others(
+    app, client, monkeypatch, execute_async_task
+):
+    from dtale_desktop import background_tasks, dtale_app
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post(
+        "/source/create/", json={**_mock_source_json, "name": "shut-down"}
+    ).json()["sources"][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=2")
+    failing, other = SOURCES[source_id].nodes.values()
+    for node in (failing, other):
+        data = execute_async_task(node.get_data())
+        dtale_app.launch_instance(data=data, data_id=node.data_id)
+        node.dtale_url = dtale_app.get_main_url(node.data_id)
+
+    kill_instance = dtale_app.kill_instance
+
+    def flaky_kill_instance(data_id):
+        if data_id == failing.data_id:
+            raise ConnectionError("the dtale worker did not respond")
+        kill_instance(data_id)
+
+    monkeypatch.setattr(dtale_app, "kill_instance", flaky_kill_instance)
+    execute_async_task(
+        background_tasks._shut_down_dtale_instances([failing.data_id, other.data_id])
+    )
+    assert failing.dtale_url is not None
+    assert other.dtale_url is None and dtale_app.get_instance(other.data_id) is None
+    kill_instance(failing.data_id)
+
+
+def test_launch_dtale(app, client, monkeypatch, execute_async_task):
+    from dtale_desktop import dtale_app
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post(
+        "/source/create/", json={**_mock_source_json, "name": "launch"}
+    ).json()["sources"][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=2")
+    ready, not_ready = SOURCES[source_id].nodes.values()
+
+    ready_servers = set()
+    monkeypatch.setattr(dtale_app, "_READY_SERVERS", ready_servers)
+    monkeypatch.setattr(dtale_app.dtale.views, "is_up", lambda base: False)
+    monkeypatch.setattr(app.settings, "DTALE_STARTUP_TIMEOUT", 0)
+    execute_async_task(not_ready.launch_dtale())
+    assert not_ready.error is not None and not_ready.dtale_url is None
+
+    ready_servers.add(dtale_app.DTALE_INTERNAL_ROOT_URL)
+    assert execute_async_task(ready.launch_dtale()) is not None
+    assert ready.error is None
+    assert ready.dtale_url == dtale_app.get_main_url(ready.data_id)
+
+
+def test_launch_sharded_dtale_without_reading_cache(
+    app, client, monkeypatch, execute_async_task
+):
+    from dtale_desktop import dtale_app
+    from dtale_desktop.file_system import fs
+    from dtale_desktop.models import SOURCES
+
+    source_id = client.post(
+        "/source/create/", json={**_mock_source_json, "name": "sharded"}
+    ).json()["sources"][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=1")
+    (node,) = SOURCES[source_id].nodes.values()
+    execute_async_task(node.get_data())
+
+    async def wait_until_ready(timeout, data_id=None):
+        return True
+
+    launched = []
+    monkeypatch.setattr(app.settings, "DTALE_SHARDS", 1)
+    monkeypatch.setattr(dtale_app, "wait_until_ready", wait_until_ready)
+    monkeypatch.setattr(
+        dtale_app, "launch_instance", lambda *args: launched.append(args)
+    )
+    monkeypatch.setattr(fs, "read_data", lambda data_id: pytest.fail("read"))
+    execute_async_task(node.launch_dtale())
+    assert node.error is None
+    assert launched == [(None, node.data_id, True)]
+
+
+_get_preview_sample = """
+import pandas as pd
+
+def main(path, nrows):
+    return pd.DataFrame({"foo": [1], "bar": [3]})
+"""
+
+
+def test_launch_dtale_with_preview(app, client, monkeypatch, execute_async_task):
+    from dtale_desktop import background_tasks, dtale_app
+    from dtale_desktop.file_system import fs
+    from dtale_desktop.models import SOURCES
+
+    monkeypatch.setattr(
+        dtale_app, "_READY_SERVERS", {dtale_app.DTALE_INTERNAL_ROOT_URL}
+    )
+    monkeypatch.setattr(app.settings, "PREVIEW_ROWS", 1)
+    source = client.post(
+        "/source/create/",
+        json={
+            **_mock_source_json,
+            "name": "preview",
+            "getPreview": _get_preview_sample,
+        },
+    ).json()["sources"][0]
+    assert source["getPreview"] == _get_preview_sample
+    client.get(f"/source/{source['id']}/load-nodes/?limit=1")
+    (node,) = SOURCES[source["id"]].nodes.values()
+
+    execute_async_task(node.launch_dtale())
+    assert node.preview and node.error is None
+    assert len(dtale_app.get_instance(node.data_id).data) == 1
+    assert not fs.data_exists(node.data_id)
+
+    # Opening the node again while the full data is loading doesn't swap it in a second time.
+    updates = []
+    update_instance_data = dtale_app.update_instance_data
+    monkeypatch.setattr(
+        dtale_app,
+        "update_instance_data",
+        lambda *args: updates.append(args[1]) or update_instance_data(*args),
+    )
+
+    async def open_twice():
+        await asyncio.gather(
+            background_tasks.start(background_tasks.replace_preview(node)),
+            background_tasks.start(background_tasks.replace_preview(node)),
+        )
+
+    execute_async_task(open_twice())
+    assert updates == [node.data_id]
+    assert not node.preview and node.error is None
+    assert len(dtale_app.get_instance(node.data_id).data) == 2
+    assert fs.data_exists(node.data_id)
+
+    # Once the data is cached there's no point in showing a preview.
+    node.shut_down()
+    execute_async_task(node.launch_dtale())
+    assert not node.preview
+
+
+def test_dtale_instances_restored_after_restart(
+    app, client, monkeypatch, execute_async_task
+):
+    import time
+    from collections import OrderedDict
+    from dtale_desktop import background_tasks, dtale_app
+    from dtale_desktop.models import SOURCES
+
+    monkeypatch.setattr(dtale_app, "_INSTANCES", OrderedDict())
+    monkeypatch.setattr(
+        dtale_app, "_READY_SERVERS", {dtale_app.DTALE_INTERNAL_ROOT_URL}
+    )
+    source_id = client.post(
+        "/source/create/", json={**_mock_source_json, "name": "restore"}
+    ).json()["sources"][0]["id"]
+    source = SOURCES[source_id]
+    client.get(f"/source/{source_id}/load-nodes/?limit=2")
+    older, newer = source.nodes.values()
+    for node in (older, newer):
+        execute_async_task(node.launch_dtale())
+        time.sleep(0.01)
+    background_tasks.snapshot_dtale_instances()
+
+    # Simulate a restart
+    for node in (older, newer):
+        node.shut_down()
+    source.nodes.clear()
+    source._path_generator = None
+
+    monkeypatch.setattr(app.settings, "EAGER_RESTORE_COUNT", 1)
+    execute_async_task(background_tasks.restore_dtale_instances())
+    restored_older, restored_newer = (
+        source.nodes[older.data_id],
+        source.nodes[newer.data_id],
+    )
+    assert dtale_app.is_running(newer.data_id)
+    assert not dtale_app.is_running(older.data_id)
+    assert restored_older.dtale_url == dtale_app.get_main_url(older.data_id)
+
+    # The other one is launched once something asks dtale for it
+    dtale_app._PENDING_RESTORES.pop(dtale_app._format_data_id(older.data_id))()
+    assert dtale_app.is_running(older.data_id)
+
+    # Loading nodes keeps the restored objects
+    client.get(f"/source/{source_id}/load-nodes/?limit=2")
+    assert source.nodes[older.data_id] is restored_older
+    assert source.nodes[newer.data_id] is restored_newer
+    assert list(source.nodes) == [older.data_id, newer.data_id]
+
+
+def test_profile_report_queue(execute_async_task):
+    import asyncio
+    from dtale_desktop.profile_report_queue import ProfileReportQueue
+
+    async def scenario():
+        queue = ProfileReportQueue(workers=1)
+        release = asyncio.Event()
+        builds = []
+
+        async def build(data_id):
+            builds.append(data_id)
+            await release.wait()
+
+        a = queue.submit("a", lambda: build("a"))
+        b = queue.submit("b", lambda: build("b"))
+        c = queue.submit("c", lambda: build("c"))
+        assert queue.submit("a", lambda: build("a")) is a
+        await asyncio.sleep(0)
+        assert [queue.position(x) for x in "abcd"] == [0, 1, 2, None]
+
+        assert queue.cancel("b") and b.cancelled()
+        assert queue.position("c") == 1
+        release.set()
+        await a
+        await c
+        assert builds == ["a", "c"]
+
+        # Running builds can be cancelled too.
+        release.clear()
+        d = queue.submit("d", lambda: build("d"))
+        await asyncio.sleep(0)
+        assert queue.cancel("d")
+        with pytest.raises(asyncio.CancelledError):
+            await d
+        assert queue.position("d") is None and not queue.cancel("d")
+
+    execute_async_task(scenario())
+
+
+def test_profile_report_worker_pool(execute_async_task):
+    import time
+    from dtale_desktop.profile_report_workers import WorkerPool
+
+    async def scenario():
+        pool = WorkerPool(os.getpid, max_jobs=2)
+        try:
+            first, second, third = [await pool.run() for _ in range(3)]
+            # Workers are reused until they've run max_jobs jobs, and then replaced.
+            assert first == second != third != os.getpid()
+        finally:
+            pool.shut_down()
+
+        pool = WorkerPool(os.getpid)
+        try:
+            # A worker started ahead of time is used for the next job, and only one is started.
+            pool.start_worker()
+            pool.start_worker()
+            assert len(pool._idle) == 1
+            started = pool._idle[0].process.pid
+            assert await pool.run() == started
+        finally:
+            pool.shut_down()
+
+        pool = WorkerPool(time.sleep, max_workers=1)
+        try:
+            # No more than max_workers are started, even while they're all busy.
+            job = asyncio.ensure_future(pool.run(0.5))
+            await asyncio.sleep(0.1)
+            pool.start_worker()
+            assert pool._idle == []
+            await job
+        finally:
+            pool.shut_down()
+
+        pool = WorkerPool(divmod)
+        try:
+            assert await pool.run(7, 2) == (3, 1)
+            with pytest.raises(Exception, match="ZeroDivisionError"):
+                await pool.run(1, 0)
+        finally:
+            pool.shut_down()
+
+    execute_async_task(scenario())
+
+
+def test_profile_report_modes():
+    import pandas as pd
+    from dtale_desktop.profile_report_modes import ProfileReportMode
+    from dtale_desktop.routers.profile_reports import get_profile_report_mode
+
+    full = ProfileReportMode()
+    assert full.report_id("abc") == "abc"
+    assert full.apply(pd.DataFrame({"a": [1]})).shape == (1, 1)
+
+    mode = get_profile_report_mode(minimal=True, sample_rows=10, columns=["b", "c"])
+    assert mode.report_id("abc").startswith("abc.minimal-sample10-columns")
+    assert mode.report_id("abc") != mode._replace(columns=("b",)).report_id("abc")
+
+    data = pd.DataFrame({"a": range(100), "b": range(100), "c": range(100)})
+    sample = mode.apply(data)
+    assert list(sample.columns) == ["b", "c"] and len(sample) == 10
+    assert sample.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(sample, mode.apply(data))
+
+
+def test_profile_report_completion_is_pushed(
+    app, client, monkeypatch, execute_async_task
+):
+    from fastapi.exceptions import HTTPException
+    from dtale_desktop import background_tasks, profile_report_workers
+    from dtale_desktop.file_system import fs
+    from dtale_desktop.models import SOURCES
+    from dtale_desktop.profile_report_modes import ProfileReportMode
+
+    async def build_profile_report(data_path, output_path, title, mode):
+        if mode.minimal:
+            # Anything left behind by a failed build is deleted.
+            fs.create_file(output_path, "")
+            fs.create_file(f"{output_path}.abc.tmp", "<html>")
+            raise Exception("Traceback: out of memory")
+        fs.create_file(output_path, "<html></html>")
+
+    broadcasts = []
+
+    async def broadcast(self, exclude=None):
+        broadcasts.append(self.node.profile_report_error)
+
+    monkeypatch.setattr(
+        profile_report_workers, "build_profile_report", build_profile_report
+    )
+    monkeypatch.setattr(background_tasks.UpdateNode, "broadcast", broadcast)
+    source_id = client.post(
+        "/source/create/", json={**_mock_source_json, "name": "report_push"}
+    ).json()["sources"][0]["id"]
+    client.get(f"/source/{source_id}/load-nodes/?limit=1")
+    (node,) = SOURCES[source_id].nodes.values()
+
+    async def scenario():
+        # Watchers wait on the build without polling, and are woken up when it finishes.
+        watcher = asyncio.ensure_future(node.wait_for_profile_report())
+        await asyncio.sleep(0)
+        assert not watcher.done()
+
+        result = node.start_profile_report(ProfileReportMode(minimal=True))
+        await background_tasks.broadcast_profile_report_result(node, result)
+        assert broadcasts == ["Traceback: out of memory"]
+        with pytest.raises(HTTPException) as e:
+            await watcher
+        assert e.value.status_code == 500
+        report_path = fs.profile_report_path(
+            ProfileReportMode(minimal=True).report_id(node.data_id)
+        )
+        assert not os.path.exists(report_path)
+        assert not os.path.exists(f"{report_path}.abc.tmp")
+
+        # Cancelling the build wakes watchers up too.
+        watcher = asyncio.ensure_future(node.wait_for_profile_report())
+        await asyncio.sleep(0)
+        result = node.start_profile_report(ProfileReportMode(sample_rows=10))
+        result.cancel()
+        with pytest.raises(HTTPException) as e:
+            await watcher
+        assert e.value.status_code == 409
+
+        result = node.start_profile_report()
+        await background_tasks.broadcast_profile_report_result(node, result)
+        assert broadcasts[-1] is None
+        await node.wait_for_profile_report()
+        assert node.start_profile_report() is None
+
+    execute_async_task(scenario())
+
+    response = client.get("/node/watch-profile-report-builder/unknown/")
+    assert response.status_code == 404
+
+    from dtale_desktop.routers import profile_reports
+
+    monkeypatch.setattr(profile_reports, "WATCH_TIMEOUT", 0.01)
+    response = client.get(f"/node/watch-profile-report-builder/{node.data_id}/")
+    assert response.status_code == 200
+    fs.delete_profile_reports(node.data_id)
+    response = client.get(f"/node/watch-profile-report-builder/{node.data_id}/")
+    assert response.status_code == 400
+
+
+def test_view_compressed_profile_report(client):
+    import gzip
+    from dtale_desktop.file_system import fs
+
+    html = "<html>" + "report " * 1000 + "</html>"
+    with gzip.open(fs.profile_report_path("gzipped"), "wt", encoding="utf-8") as f:
+        f.write(html)
+    fs.register_profile_report("gzipped")
+    assert os.path.getsize(fs.profile_report_path("gzipped")) < len(html)
+
+    response = client.get("/node/view-profile-report/gzipped/")
+    assert response.status_code == 200 and response.text == html
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/node/view-profile-report/gzipped/", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    # Browsers which don't accept gzip get it decompressed on the fly.
+    response = client.get(
+        "/node/view-profile-report/gzipped/", headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in response.headers and response.text == html
+
+    # Reports written before they were compressed are still served.
+    with open(os.path.join(fs.PROFILE_REPORTS_DIR, "plain.html"), "w") as f:
+        f.write(html)
+    fs.register_profile_report("plain")
+    response = client.get("/node/view-profile-report/plain/")
+    assert response.text == html and "content-encoding" not in response.headers
+
+    fs.delete_profile_report("plain")
+    assert client.get("/node/view-profile-report/plain/").status_code == 404
@@ -1,3 +1,4 @@
+import os
 from hashlib import md5
 import pandas as pd
 import pytest
@@ -64,3 +65,142 @@ def test_kill_instance(dtale_app, data, data_id):
 
         dtale_app.kill_instance(data_id)
         assert c.get(main_url).status_code != 200
+
+
+def test_instances_over_budget(dtale_app, data, monkeypatch):
+    from collections import OrderedDict
+
+    monkeypatch.setattr(dtale_app, "_INSTANCES", OrderedDict())
+    data_ids = [md5(str(i).encode("utf8")).hexdigest() for i in range(3)]
+    for data_id in data_ids:
+        dtale_app.launch_instance(data=data, data_id=data_id)
+    size = dtale_app._INSTANCES[dtale_app._format_data_id(data_ids[0])].memory_usage
+    dtale_app.mark_instance_used(data_ids[0])
+
+    assert dtale_app.instances_over_budget(size * 3) == []
+    assert dtale_app.instances_over_budget(size * 2) == [data_ids[1]]
+    assert dtale_app.instances_over_budget(size, keep=[data_ids[1]]) == [
+        data_ids[2],
+        data_ids[0],
+    ]
+
+    dtale_app.kill_instance(data_ids[1])
+    assert dtale_app.instances_over_budget(size * 2) == []
+
+
+def test_requests_mark_instances_used(dtale_app, data, data_id, monkeypatch):
+    from collections import OrderedDict
+
+    monkeypatch.setattr(dtale_app, "_INSTANCES", OrderedDict())
+    dtale_app.launch_instance(data=data, data_id=data_id)
+    key = dtale_app._format_data_id(data_id)
+    dtale_app._INSTANCES[key] = dtale_app._INSTANCES[key]._replace(last_accessed_at=0)
+    assert dtale_app.idle_instances(60) == [data_id]
+
+    with dtale_app.app.test_client() as c:
+        c.get(f"/dtale/main/{key}")
+    assert dtale_app.idle_instances(60) == []
+
+
+def test_wait_until_ready(dtale_app, monkeypatch):
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    monkeypatch.setattr(dtale_app, "_READY_SERVERS", set())
+    monkeypatch.setattr(dtale_app.dtale.views, "is_up", lambda base: False)
+    assert loop.run_until_complete(dtale_app.wait_until_ready(0.05)) is False
+
+    monkeypatch.setattr(dtale_app.dtale.views, "is_up", lambda base: True)
+    assert loop.run_until_complete(dtale_app.wait_until_ready(0.05)) is True
+    assert dtale_app.DTALE_INTERNAL_ROOT_URL in dtale_app._READY_SERVERS
+
+
+def test_sharded_instances(dtale_app, data, monkeypatch, tmpdir):
+    from collections import OrderedDict
+
+    monkeypatch.setattr(dtale_app, "_INSTANCES", OrderedDict())
+    monkeypatch.setattr(dtale_app.settings, "DTALE_SHARDS", 2)
+    data_ids = [md5(str(i).encode("utf8")).hexdigest() for i in range(10, 14)]
+    shards = {dtale_app._shard(data_id) for data_id in data_ids}
+    assert shards == {0, 1}
+
+    posted = []
+    monkeypatch.setattr(
+        dtale_app.requests,
+        "post",
+        lambda url, json, headers, timeout: posted.append((url, dict(json), headers))
+        or _Ok(),
+    )
+    for data_id in data_ids:
+        port = dtale_app.DTALE_PORT + dtale_app._shard(data_id)
+        assert f":{port}/dtale/main/" in dtale_app.get_main_url(data_id)
+        # The worker reads cached data itself, and says how much memory it uses.
+        dtale_app.launch_instance(data=None, data_id=data_id, cached=True)
+        assert dtale_app.running_instances()[-1].memory_usage == 100
+        assert posted[-1][0].startswith(dtale_app._internal_root_url(data_id))
+        assert posted[-1][1] == {"dataId": data_id}
+        assert posted[-1][2] == {dtale_app.SECRET_HEADER: dtale_app._SHARD_SECRET}
+        assert dtale_app.is_running(data_id)
+        assert dtale_app.get_instance(data_id) is None
+
+    # Data that isn't cached is handed over through a temporary file.
+    dtale_app.launch_instance(data=data, data_id=data_ids[0])
+    handoff_path = os.path.join(dtale_app.fs.CACHE_DIR, posted[-1][1]["handoff"])
+    assert os.path.exists(handoff_path)
+    os.remove(handoff_path)
+
+
+class _Ok:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"memoryUsage": 100}
+
+
+def test_shard_app(dtale_app, data, data_id, tmpdir):
+    from dtale import global_state
+    from dtale_desktop.cache_formats import FeatherFormat
+    from dtale_desktop.dtale_shard import SECRET_HEADER, build_shard_app
+    from werkzeug.exceptions import HTTPException
+
+    path = dtale_app.fs.write_handoff_file(data)
+    int_id = dtale_app._format_data_id(data_id)
+
+    app = build_shard_app(54322, "secret")
+
+    def call(method, url, secret="secret", **kwargs):
+        # Call the views directly, dtale's own request hooks aren't relevant here.
+        headers = {SECRET_HEADER: secret}
+        with app.test_request_context(url, method=method, headers=headers, **kwargs):
+            try:
+                return app.make_response(app.dispatch_request())
+            except HTTPException as e:
+                return e.get_response()
+
+    url = f"/dtaledesktop/instances/{int_id}"
+    handoff = {"dataId": data_id, "handoff": os.path.basename(path)}
+    assert call("POST", url, secret="wrong", json=handoff).status_code == 403
+    assert call("GET", "/dtaledesktop/instances/", secret="").status_code == 403
+    assert os.path.exists(path)
+
+    # Only files in the cache directory are read.
+    outside = os.path.join(tmpdir.strpath, "outside.handoff.feather")
+    FeatherFormat().write(outside, data)
+    for body in [
+        {"dataId": data_id, "handoff": outside},
+        {"dataId": data_id, "handoff": "../outside.handoff.feather"},
+        {"dataId": os.path.join("..", "..", "outside")},
+    ]:
+        assert call("POST", url, json=body).status_code == 400
+    assert os.path.exists(outside)
+
+    response = call("POST", url, json=handoff)
+    assert response.status_code == 200
+    assert response.json == {"memoryUsage": data.memory_usage(deep=True).sum()}
+    assert not os.path.exists(path)
+    pd.testing.assert_frame_equal(global_state.get_data(int_id), data)
+    assert str(int_id) in call("GET", "/dtaledesktop/instances/").json
+
+    assert call("DELETE", url).status_code == 204
+    assert call("GET", "/dtaledesktop/instances/").json == {}
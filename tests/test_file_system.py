@@ -0,0 +1,260 @@
+import os
+
+import pandas as pd
+import pytest
+
+from .utils import reload_app
+
+
+@pytest.fixture
+def fs(monkeypatch, tmpdir):
+    """
+    Sets environment variables before importing the file system.
+    """
+    monkeypatch.setenv("DTALEDESKTOP_ROOT_DIR", tmpdir.strpath)
+    reload_app()
+
+    from dtale_desktop.file_system import fs as _fs
+
+    return _fs
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", None]})
+
+
+@pytest.mark.parametrize("cache_format", ["pickle", "feather", "parquet"])
+def test_save_and_read_data(monkeypatch, fs, data, cache_format):
+    from dtale_desktop.settings import settings
+
+    monkeypatch.setattr(settings, "CACHE_FORMAT", cache_format)
+    fs.save_data("abc", data)
+    assert fs.data_exists("abc")
+    assert fs.data_path("abc").endswith(fs.cache_format.extension)
+    pd.testing.assert_frame_equal(fs.read_data("abc"), data)
+
+    fs.delete_data("abc")
+    assert not fs.data_exists("abc")
+
+
+@pytest.mark.parametrize("cache_format", ["pickle", "feather", "parquet"])
+def test_save_data_in_chunks(monkeypatch, fs, cache_format):
+    from dtale_desktop.settings import settings
+
+    monkeypatch.setattr(settings, "CACHE_FORMAT", cache_format)
+    chunks = [
+        pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}),
+        pd.DataFrame({"a": [3], "b": ["z"]}, index=[0]),
+    ]
+    fs.save_data("abc", (chunk for chunk in chunks))
+    entry = fs.manifest.get("data", "abc")
+    assert (entry.rows, entry.columns) == (3, 2)
+    pd.testing.assert_frame_equal(
+        fs.read_data("abc"), pd.concat(chunks, ignore_index=True)
+    )
+
+    # Types in later chunks which don't fit those of the first are combined the way pandas would.
+    chunks.append(pd.DataFrame({"a": [4.5], "b": [None]}))
+    fs.save_data("abc", iter(chunks))
+    pd.testing.assert_frame_equal(
+        fs.read_data("abc"), pd.concat(chunks, ignore_index=True)
+    )
+
+
+@pytest.mark.parametrize("cache_format", ["feather", "parquet"])
+def test_save_data_arrow_cannot_store(monkeypatch, fs, cache_format):
+    from dtale_desktop.settings import settings
+
+    monkeypatch.setattr(settings, "CACHE_FORMAT", cache_format)
+    data = pd.DataFrame({"mixed": [1, "x", 2.5], "b": [1, 2, 3]})
+    fs.save_data("abc", data)
+    assert fs.data_path("abc").endswith(".pkl")
+    pd.testing.assert_frame_equal(fs.read_data("abc"), data)
+    # Reading it doesn't keep trying to rewrite it in the configured format.
+    assert fs.data_path("abc").endswith(".pkl")
+
+    duplicates = pd.DataFrame([[1, 2]], columns=["a", "a"])
+    fs.save_data("dup", duplicates)
+    pd.testing.assert_frame_equal(fs.read_data("dup"), duplicates)
+
+    # Chunks which only turn out to be unsupported after some have been written.
+    chunks = [pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": ["x"]})]
+    fs.save_data("chunks", iter(chunks))
+    pd.testing.assert_frame_equal(
+        fs.read_data("chunks"), pd.concat(chunks, ignore_index=True)
+    )
+    path = fs.write_handoff_file(data)
+    assert path.endswith(".handoff.pkl")
+    os.remove(path)
+
+
+def test_compact_dtypes():
+    import numpy as np
+    from dtale_desktop.dtype_compaction import compact_dtypes
+
+    data = pd.DataFrame(
+        {
+            "category": ["x", "y", "x", None] * 25,
+            "unique": [str(i) for i in range(100)],
+            "small_int": range(100),
+            "float32": [0.5, 1.25, np.nan, 2.0] * 25,
+            "float64": [0.1, 0.2, 0.3, 0.4] * 25,
+        }
+    )
+    compacted = compact_dtypes(data)
+    assert compacted["category"].dtype == "category"
+    assert compacted["unique"].dtype == object
+    assert compacted["small_int"].dtype == np.int8
+    assert compacted["float32"].dtype == np.float32
+    assert compacted["float64"].dtype == np.float64
+    pd.testing.assert_frame_equal(
+        compacted, data, check_dtype=False, check_categorical=False
+    )
+    assert compact_dtypes(compacted) is compacted
+
+    # Columns are replaced by position, so duplicate labels keep their own values.
+    duplicates = pd.DataFrame([[1, "a"], [2, "a"]], columns=["x", "x"])
+    compacted = compact_dtypes(duplicates)
+    assert list(compacted.dtypes) == [np.int8, "category"]
+    assert compacted.iloc[:, 0].tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("cache_format", ["feather", "parquet"])
+def test_save_compacted_chunks(monkeypatch, fs, cache_format):
+    from dtale_desktop.settings import settings
+
+    monkeypatch.setattr(settings, "CACHE_FORMAT", cache_format)
+    chunks = [
+        pd.DataFrame({"a": [1, 2], "b": ["x", "x"]}),
+        pd.DataFrame({"a": [1000, 3], "b": ["x", "y"]}),
+    ]
+    saved = fs.save_data("abc", iter(chunks), compact=True)
+    data = fs.read_data("abc")
+    pd.testing.assert_frame_equal(saved, data)
+    assert data["a"].dtype == "int16"
+    assert data["b"].dtype == "category"
+    assert data["b"].tolist() == ["x", "x", "x", "y"]
+
+
+def test_unsupported_columns_fall_back_to_pickle(monkeypatch, fs):
+    from dtale_desktop.settings import settings
+
+    monkeypatch.setattr(settings, "CACHE_FORMAT", "feather")
+    data = pd.DataFrame({0: [1, 2], 1: [3, 4]})
+    fs.save_data("abc", data)
+    assert fs.data_path("abc").endswith(".pkl")
+    pd.testing.assert_frame_equal(fs.read_data("abc"), data)
+
+
+def test_pickle_is_migrated_on_read(monkeypatch, fs, data):
+    from dtale_desktop.settings import settings
+
+    monkeypatch.setattr(settings, "CACHE_FORMAT", "pickle")
+    fs.save_data("abc", data)
+    pickle_path = fs.data_path("abc")
+    cached_at = fs.data_last_cached_at("abc")
+
+    monkeypatch.setattr(settings, "CACHE_FORMAT", "parquet")
+    pd.testing.assert_frame_equal(fs.read_data("abc"), data)
+    assert not os.path.exists(pickle_path)
+    assert fs.data_path("abc").endswith(".parquet")
+    assert fs.data_last_cached_at("abc") == cached_at
+
+
+def test_uncompressed_feather_cache(monkeypatch, fs):
+    from dtale_desktop.settings import settings
+
+    monkeypatch.setattr(settings, "CACHE_FORMAT", "feather")
+    monkeypatch.setattr(settings, "UNCOMPRESSED_FEATHER_CACHE", True)
+    data = pd.DataFrame({"a": range(1000), "b": [0.5] * 1000})
+    fs.save_data("abc", data)
+
+    result = fs.read_data("abc")
+    pd.testing.assert_frame_equal(result, data)
+    # It's an ordinary DataFrame, so dtale can edit cells in place.
+    result.iloc[0, 0] = -1
+    assert result["a"].values.flags.writeable
+
+
+def test_manifest_shared_between_processes(fs, data):
+    from dtale_desktop.cache_manifest import CacheManifest
+
+    # ie the dtaledesktop_warm_cache command, which has its own manifest.
+    other = CacheManifest(fs.manifest.path)
+    assert not fs.data_exists("abc")
+    other.put(fs.write_data_file("abc", data))
+    # Lookups are answered from memory until the manifest is refreshed.
+    assert not fs.data_exists("abc")
+    fs.manifest.refresh()
+    assert fs.data_exists("abc")
+
+    # Access times are written in batches rather than on every read.
+    accessed_at = fs.manifest.get("data", "abc").accessed_at + 100
+    fs.manifest.touch("data", "abc", accessed_at)
+    assert CacheManifest(fs.manifest.path).get("data", "abc").accessed_at < accessed_at
+    assert [e.accessed_at for e in fs.manifest.entries()] == [accessed_at]
+    assert CacheManifest(fs.manifest.path).get("data", "abc").accessed_at == accessed_at
+
+
+def test_evict_cached_files(fs, data):
+    for i, data_id in enumerate(["a", "b", "c"]):
+        fs.save_data(data_id, data)
+        fs.manifest.touch("data", data_id, 1000000000 + i)
+    # Reading "a" makes it the most recently accessed file.
+    fs.read_data("a")
+
+    assert fs.evict_cached_files(max_files=3) == []
+    assert fs.evict_cached_files(max_files=1) == ["b", "c"]
+    assert fs.data_exists("a")
+    assert not fs.data_exists("b")
+    assert not fs.data_exists("c")
+
+    assert fs.evict_cached_files(max_bytes=0) == ["a"]
+    assert not fs.data_exists("a")
+
+
+def test_manifest_tracks_cached_data(fs, data):
+    assert fs.data_last_cached_at("abc") is None
+
+    fs.save_data("abc", data)
+    entry = fs.manifest.get("data", "abc")
+    assert entry.size == os.path.getsize(fs.data_path("abc"))
+    assert (entry.rows, entry.columns) == data.shape
+    assert fs.data_last_cached_at("abc") == int(entry.modified_at) * 1000
+
+    fs.delete_data("abc")
+    assert fs.manifest.get("data", "abc") is None
+
+
+def test_manifest_rebuilt_from_existing_files(fs, data):
+    from dtale_desktop.cache_manifest import CacheManifest
+
+    fs.save_data("abc", data)
+    fs.create_file(fs.profile_report_path("abc"), "<html></html>")
+    os.remove(fs.manifest.path)
+
+    fs.manifest = CacheManifest(fs.manifest.path)
+    assert fs.manifest.created
+    assert not fs.data_exists("abc")
+
+    fs.rebuild_manifest()
+    assert fs.data_exists("abc")
+    assert fs.profile_report_exists("abc")
+    pd.testing.assert_frame_equal(fs.read_data("abc"), data)
+
+
+def test_delete_profile_reports_in_every_mode(fs):
+    for report_id in ["abc", "abc.minimal", "abc.sample1000", "abcd"]:
+        fs.create_file(fs.profile_report_path(report_id), "<html></html>")
+        fs.register_profile_report(report_id)
+    assert sorted(fs.profile_report_files("abc")) == [
+        "abc",
+        "abc.minimal",
+        "abc.sample1000",
+    ]
+
+    fs.delete_all_cached_data("abc")
+    assert fs.profile_report_files("abc") == []
+    assert not fs.profile_report_exists("abc.minimal")
+    assert fs.profile_report_exists("abcd")
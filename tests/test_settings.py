@@ -32,7 +32,7 @@ def test_disable_edit_layout(monkeypatch):
 
 def test_disable_profile_reports(monkeypatch):
     app = reload_app()
-    assert len([r for r in app.routes if "profile-report" in r.path]) == 4
+    assert len([r for r in app.routes if "profile-report" in r.path]) == 6
     monkeypatch.setenv("DTALEDESKTOP_DISABLE_PROFILE_REPORTS", "true")
     app = reload_app()
     assert len([r for r in app.routes if "profile-report" in r.path]) == 0